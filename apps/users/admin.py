@@ -1,14 +1,22 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from core.db_router import ReplicaReadAdminMixin
+from apps.users.pagination import EstimatedCountPaginator
+from apps.users.search import search_users
 from .models import User, UserRegion, UserSubRegion, Profession, UserRole
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(ReplicaReadAdminMixin, BaseUserAdmin):
     model = User
-    list_display = ('email', 'full_name', 'is_verified', 'role', 'is_staff')
+    list_display = ('email', 'full_name', 'is_verified', 'role', 'profession', 'subregion', 'is_staff')
+    list_select_related = ('role', 'profession', 'subregion')
     list_filter = ('is_verified', 'role', 'is_staff', 'is_superuser')
     search_fields = ('email', 'full_name', 'phone')
+    search_help_text = 'Email или телефон — по началу строки, остальное — по словам имени'
     ordering = ('-date_joined',)
+    # Без точного COUNT(*) по всей таблице (apps/users/pagination.py)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
@@ -26,21 +34,30 @@ class UserAdmin(BaseUserAdmin):
         ),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        # Индексированный поиск (apps/users/search.py) вместо трёх icontains
+        results = search_users(queryset, search_term)
+        if results is None:
+            return super().get_search_results(request, queryset, search_term)
+        return results, False
+
 
 @admin.register(UserRegion)
-class UserRegionAdmin(admin.ModelAdmin):
+class UserRegionAdmin(ReplicaReadAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'title')
     search_fields = ('title',)
 
 @admin.register(UserSubRegion)
-class UserSubRegionAdmin(admin.ModelAdmin):
+class UserSubRegionAdmin(ReplicaReadAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'title', 'region')
     search_fields = ('title',)
     list_filter = ('region',)
 
 @admin.register(Profession)
-class ProfessionAdmin(admin.ModelAdmin):
+class ProfessionAdmin(ReplicaReadAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'title')
     search_fields = ('title',)
 
-admin.site.register(UserRole)
\ No newline at end of file
+@admin.register(UserRole)
+class UserRoleAdmin(ReplicaReadAdminMixin, admin.ModelAdmin):
+    pass
@@ -0,0 +1,126 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+# Аутентификация по claims токена без загрузки пользователя из БД.
+# При выдаче токена в него записываются role, is_verified, is_active и is_staff
+# (set_user_claims). Если пользователь изменился после выдачи токена
+# (роль, верификация, удаление), invalidate_user_claims сохраняет в кэше
+# время изменения, и токены с более ранними claims обрабатываются через БД.
+# Claims доверяются не дольше AUTH_CLAIMS_MAX_AGE: если запись в кэше потеряна
+# (перезапуск Redis, вытеснение), удалённый пользователь проходит по старому
+# токену не дольше этого срока. Недоступный кэш не ломает аутентификацию:
+# пользователь читается из БД.
+
+logger = logging.getLogger(__name__)
+
+CLAIMS_VERSION_CLAIM = 'claims_version'
+CLAIMS_VERSION = 2
+# Время, на которое claims актуальны (iat копируется из refresh-токена, поэтому не подходит)
+CLAIMS_AT_CLAIM = 'claims_at'
+
+INVALIDATED_KEY = 'auth:claims_invalidated:{}'
+
+# Поля пользователя, попадающие в claims: их изменение требует invalidate_user_claims
+CLAIM_FIELDS = ('role_id', 'is_verified', 'is_active', 'is_staff', 'is_superuser')
+
+
+def _claims_max_age():
+    return int(settings.AUTH_CLAIMS_MAX_AGE.total_seconds())
+
+
+def set_user_claims(token, user):
+    token['role'] = user.role.name if user.role_id else None
+    token['is_verified'] = user.is_verified
+    token['is_active'] = user.is_active
+    # is_staff и is_superuser читает TokenUser (IsAdminUser и т. п.)
+    token['is_staff'] = user.is_staff
+    token['is_superuser'] = user.is_superuser
+    token[CLAIMS_VERSION_CLAIM] = CLAIMS_VERSION
+    token[CLAIMS_AT_CLAIM] = int(time.time())
+    return token
+
+
+def invalidate_user_claims(user_id):
+    # Запись нужна, пока claims выданных ранее токенов ещё доверяются
+    try:
+        cache.set(INVALIDATED_KEY.format(user_id), int(time.time()), timeout=_claims_max_age())
+    except Exception:
+        logger.exception("Не удалось сбросить claims пользователя %s", user_id)
+
+
+class ClaimsUser(TokenUser):
+    """Пользователь, построенный из claims токена. role — имя роли (UserRole.name)."""
+
+    @property
+    def is_active(self):
+        return self.token.get('is_active', False)
+
+    @property
+    def is_verified(self):
+        return self.token.get('is_verified', False)
+
+    @property
+    def role(self):
+        return self.token.get('role')
+
+
+class _UserModelWithRole:
+    # JWTAuthentication.get_user обращается к user_model.objects и DoesNotExist:
+    # роль загружается тем же запросом, проверки прав не делают второй
+    def __init__(self, model):
+        self.objects = model.objects.select_related('role')
+        self.DoesNotExist = model.DoesNotExist
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user_model = _UserModelWithRole(self.user_model)
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        if validated_token.get(CLAIMS_VERSION_CLAIM) != CLAIMS_VERSION:
+            # Токен выдан до появления claims
+            return super().get_user(validated_token)
+
+        claims_at = validated_token.get(CLAIMS_AT_CLAIM, 0)
+        if time.time() - claims_at > _claims_max_age():
+            # Claims устарели — до обновления токена пользователь читается из БД
+            return super().get_user(validated_token)
+
+        try:
+            invalidated_at = cache.get(INVALIDATED_KEY.format(user_id))
+        except Exception:
+            logger.warning("Кэш недоступен, пользователь %s читается из БД", user_id, exc_info=True)
+            return super().get_user(validated_token)
+        if invalidated_at is not None and claims_at <= invalidated_at:
+            return super().get_user(validated_token)
+
+        user = ClaimsUser(validated_token)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return user
+
+
+def get_db_user(request):
+    """Пользователь запроса как строка БД — для представлений, которые его изменяют."""
+    from apps.users.models import User
+
+    user = request.user
+    if isinstance(user, User):
+        return user
+    if not hasattr(request, '_db_user'):
+        request._db_user = User.objects.get(pk=user.pk)
+    return request._db_user
@@ -0,0 +1,147 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+
+from apps.users.models import PassportUpload
+from apps.users.uploads import normalize_passport_image, save_inference_artifacts
+
+# Возобновляемая загрузка фото паспорта частями: init → PUT частей со смещением
+# (Upload-Offset) и контрольной суммой части (Upload-Checksum: sha256 в hex) →
+# status → complete. Части дописываются во временный файл вне MEDIA_ROOT,
+# при обрыве клиент узнаёт смещение через status и досылает только недостающее.
+# При нескольких веб-хостах PASSPORT_CHUNKED_UPLOAD_DIR должен быть общим.
+
+
+class ChunkError(Exception):
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def upload_dir():
+    return str(getattr(settings, 'PASSPORT_CHUNKED_UPLOAD_DIR', settings.BASE_DIR / 'uploads_tmp'))
+
+
+def part_path(upload):
+    return os.path.join(upload_dir(), f"{upload.id}.part")
+
+
+def _part_size(path):
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+def _check_part_size(upload, path):
+    """
+    Временный файл короче сохранённого смещения (очищен или запрос попал на
+    другой хост): truncate дополнил бы его нулями. Смещение откатывается к
+    фактическому размеру, клиент досылает недостающее с него.
+    """
+    size = _part_size(path)
+    if size < upload.offset:
+        upload.offset = size
+        PassportUpload.objects.filter(pk=upload.pk).update(offset=size)
+        raise ChunkError('Часть загрузки потеряна, продолжите с указанного смещения', 409)
+
+
+def append_chunk(upload, offset, data, checksum):
+    """Дописывает часть. upload должен быть заблокирован (select_for_update)."""
+    if upload.status != PassportUpload.STATUS_PENDING:
+        raise ChunkError('Загрузка уже завершена', 409)
+    if offset != upload.offset:
+        raise ChunkError('Неверное смещение', 409)
+    if not data:
+        raise ChunkError('Пустая часть', 400)
+    if upload.offset + len(data) > upload.size:
+        raise ChunkError('Данных больше заявленного размера', 413)
+    if checksum and hashlib.sha256(data).hexdigest() != checksum.lower():
+        raise ChunkError('Контрольная сумма части не совпадает', 400)
+
+    path = part_path(upload)
+    _check_part_size(upload, path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'ab') as f:
+        # Хвост от записи, не попавшей в БД (обрыв между write и save), отбрасываем
+        f.truncate(upload.offset)
+        f.seek(upload.offset)
+        f.write(data)
+
+    upload.offset += len(data)
+    upload.save(update_fields=['offset', 'updated_at'])
+    return upload.offset
+
+
+def _remove_part(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def complete_upload(upload):
+    """
+    Проверяет файл целиком, прикрепляет его к пользователю и удаляет временный файл.
+    Декодирование и запись изображения идут вне транзакции: под блокировкой
+    строки загрузки только прикрепляется файл и меняется статус.
+    Повторный вызов для завершённой загрузки возвращает тот же результат.
+    """
+    if upload.status == PassportUpload.STATUS_COMPLETED:
+        return upload.user
+    if upload.offset != upload.size:
+        raise ChunkError('Загружены не все части', 409)
+
+    path = part_path(upload)
+    _check_part_size(upload, path)
+    with open(path, 'rb') as f:
+        if upload.sha256:
+            digest = hashlib.sha256()
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+            if digest.hexdigest() != upload.sha256.lower():
+                raise ChunkError('Контрольная сумма файла не совпадает', 400)
+            f.seek(0)
+
+        content = normalize_passport_image(File(f, name=upload.filename or f"{upload.field}.jpg"))
+
+    user = upload.user
+    field = user._meta.get_field(upload.field)
+    name = field.storage.save(field.generate_filename(user, content.name), content, max_length=field.max_length)
+
+    with transaction.atomic():
+        locked = PassportUpload.objects.select_for_update().get(pk=upload.pk)
+        if locked.status != PassportUpload.STATUS_PENDING:
+            # Параллельный complete той же загрузки успел раньше — его результат и возвращаем
+            field.storage.delete(name)
+            upload.status = locked.status
+            user.refresh_from_db(fields=[upload.field])
+            return user
+        setattr(user, upload.field, name)
+        user.save(update_fields=[upload.field])
+        locked.status = PassportUpload.STATUS_COMPLETED
+        locked.save(update_fields=['status', 'updated_at'])
+        transaction.on_commit(lambda: _remove_part(path))
+
+    upload.status = locked.status
+    save_inference_artifacts(user, {upload.field: content})
+    return user
+
+
+def claim_verification_batch(user):
+    """
+    Если у пользователя есть завершённые и ещё не проверенные загрузки всех
+    трёх сторон, помечает их и возвращает True — можно запускать проверку.
+    """
+    fields = {choice for choice, _ in PassportUpload.FIELD_CHOICES}
+    completed = PassportUpload.objects.filter(
+        user=user,
+        status=PassportUpload.STATUS_COMPLETED,
+        verification_started=False,
+    )
+    if set(completed.values_list('field', flat=True)) != fields:
+        return False
+    return completed.update(verification_started=True) > 0
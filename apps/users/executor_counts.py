@@ -0,0 +1,120 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+
+from apps.users.models import ExecutorCount, User
+from apps.users.reference import EXECUTOR_COUNTS, bump_version, get_role_id
+
+# Счётчики исполнителей по (профессия, подрегион) для страниц каталога: чтение —
+# одна строка ExecutorCount вместо COUNT ... GROUP BY по users_user.
+#
+# Каждый пользователь учитывается в не более чем одной строке: роль «исполнитель»,
+# заданы профессия и подрегион. Сигналы User (signals.py) читают прежнее состояние
+# перед save()/delete() и переносят пользователя между строками
+# через UPDATE ... SET total = total ± 1. Изменения мимо сигналов (queryset.update)
+# обязаны вызывать apply_change сами, как задача проверки паспорта.
+# Расхождения находит и исправляет manage.py executor_counts.
+
+EXECUTOR_ROLE = 'исполнитель'
+
+TRACKED_FIELDS = ('role_id', 'profession_id', 'subregion_id', 'is_verified')
+
+
+def counted_key(state):
+    """(profession_id, subregion_id, is_verified) для учитываемого пользователя, иначе None."""
+    if state is None or None in (state['role_id'], state['profession_id'], state['subregion_id']):
+        return None
+    if state['role_id'] != get_role_id(EXECUTOR_ROLE):
+        return None
+    return state['profession_id'], state['subregion_id'], bool(state['is_verified'])
+
+
+def load_state(user_id):
+    return User.objects.filter(pk=user_id).values(*TRACKED_FIELDS).first()
+
+
+def _add(profession_id, subregion_id, verified, delta):
+    rows = ExecutorCount.objects.filter(profession_id=profession_id, subregion_id=subregion_id)
+    changes = {'total': F('total') + delta}
+    if verified:
+        changes['verified'] = F('verified') + delta
+    if rows.update(**changes) or delta < 0:
+        # Нечего уменьшать — расхождение исправит пересчёт
+        return
+    try:
+        with transaction.atomic():
+            ExecutorCount.objects.create(
+                profession_id=profession_id, subregion_id=subregion_id,
+                total=delta, verified=delta if verified else 0,
+            )
+    except IntegrityError:
+        # Строку параллельно создал другой процесс
+        rows.update(**changes)
+
+
+def apply_change(old_key, new_key):
+    if old_key == new_key:
+        return
+    if old_key is not None:
+        _add(*old_key, -1)
+    if new_key is not None:
+        _add(*new_key, 1)
+    transaction.on_commit(lambda: bump_version(EXECUTOR_COUNTS))
+
+
+def mark_verified(user_id):
+    """Подтверждает пользователя одним UPDATE без save() и обновляет счётчики. True, если статус изменился."""
+    with transaction.atomic():
+        state = User.objects.select_for_update().filter(pk=user_id).values(*TRACKED_FIELDS).first()
+        if state is None or state['is_verified']:
+            return False
+        User.objects.filter(pk=user_id).update(is_verified=True)
+        apply_change(counted_key(state), counted_key({**state, 'is_verified': True}))
+    return True
+
+
+def actual_counts():
+    """{(profession_id, subregion_id): (total, verified)} одним GROUP BY по пользователям."""
+    role_id = get_role_id(EXECUTOR_ROLE)
+    if role_id is None:
+        return {}
+    rows = (
+        User.objects.filter(role_id=role_id, profession__isnull=False, subregion__isnull=False)
+        .values('profession_id', 'subregion_id')
+        .annotate(total=Count('id'), verified=Count('id', filter=Q(is_verified=True)))
+        .order_by()
+    )
+    return {(r['profession_id'], r['subregion_id']): (r['total'], r['verified']) for r in rows}
+
+
+def find_drift():
+    """Список (profession_id, subregion_id, сохранено, фактически) для расходящихся строк."""
+    stored = {
+        (p, s): (total, verified)
+        for p, s, total, verified in ExecutorCount.objects.values_list('profession_id', 'subregion_id', 'total', 'verified')
+    }
+    actual = actual_counts()
+    drift = []
+    for key in sorted(stored.keys() | actual.keys()):
+        have, want = stored.get(key, (0, 0)), actual.get(key, (0, 0))
+        if have != want:
+            drift.append((*key, have, want))
+    return drift
+
+
+def recompute():
+    """Приводит таблицу к фактическим значениям. Возвращает исправленные расхождения."""
+    with transaction.atomic():
+        # Блокируем строки, чтобы параллельные инкременты не потерялись между подсчётом и записью
+        list(ExecutorCount.objects.select_for_update().values_list('pk', flat=True))
+        drift = find_drift()
+        for profession_id, subregion_id, _, (total, verified) in drift:
+            rows = ExecutorCount.objects.filter(profession_id=profession_id, subregion_id=subregion_id)
+            if not total:
+                rows.delete()
+            elif not rows.update(total=total, verified=verified):
+                ExecutorCount.objects.create(
+                    profession_id=profession_id, subregion_id=subregion_id, total=total, verified=verified,
+                )
+        if drift:
+            transaction.on_commit(lambda: bump_version(EXECUTOR_COUNTS))
+    return drift
@@ -0,0 +1,68 @@
+import threading
+import time
+from smtplib import SMTPRecipientsRefused, SMTPResponseException, SMTPServerDisconnected
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+# Одно SMTP-соединение на процесс воркера, переиспользуемое между задачами.
+# Соединение переоткрывается, если простаивало дольше EMAIL_CONNECTION_IDLE_TIMEOUT
+# секунд или сервер его закрыл.
+_connection = None
+_last_used = 0.0
+_lock = threading.Lock()
+
+
+def _get_connection():
+    global _connection, _last_used
+    idle_timeout = getattr(settings, 'EMAIL_CONNECTION_IDLE_TIMEOUT', 60)
+    if _connection is not None and time.monotonic() - _last_used > idle_timeout:
+        close_connection()
+    if _connection is None:
+        _connection = get_connection(fail_silently=False)
+        _connection.open()
+    _last_used = time.monotonic()
+    return _connection
+
+
+def close_connection():
+    global _connection
+    if _connection is not None:
+        try:
+            _connection.close()
+        except Exception:
+            pass
+        _connection = None
+
+
+class PermanentEmailError(Exception):
+    """Сервер окончательно отклонил письмо (5xx) — повтор не поможет."""
+
+
+def is_permanent_error(exc):
+    # 4xx (greylisting, переполненный ящик, занятый сервер) — временные ошибки
+    if isinstance(exc, SMTPRecipientsRefused):
+        return bool(exc.recipients) and all(code >= 500 for code, _ in exc.recipients.values())
+    return isinstance(exc, SMTPResponseException) and exc.smtp_code >= 500
+
+
+def send_messages(messages):
+    """Отправляет список EmailMessage через общее соединение, при обрыве — одна попытка переподключения."""
+    with _lock:
+        try:
+            return _get_connection().send_messages(messages)
+        except SMTPServerDisconnected:
+            close_connection()
+            return _get_connection().send_messages(messages)
+        except Exception:
+            close_connection()
+            raise
+
+
+def verification_email(email, code):
+    return EmailMessage(
+        subject='Подтверждение Email',
+        body=f'Ваш код подтверждения: {code}',
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[email],
+    )
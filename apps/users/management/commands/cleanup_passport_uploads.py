@@ -0,0 +1,30 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.users.chunked_upload import part_path
+from apps.users.models import PassportUpload
+
+
+class Command(BaseCommand):
+    help = 'Удаляет незавершённые загрузки фото паспорта и их временные файлы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='Возраст последней активности, часов')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = PassportUpload.objects.filter(status=PassportUpload.STATUS_PENDING, updated_at__lt=cutoff)
+
+        removed = 0
+        for upload in stale.iterator():
+            try:
+                os.remove(part_path(upload))
+            except FileNotFoundError:
+                pass
+            removed += 1
+        stale.delete()
+
+        self.stdout.write(f"Удалено незавершённых загрузок: {removed}")
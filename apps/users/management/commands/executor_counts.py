@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.users.executor_counts import find_drift, recompute
+
+
+class Command(BaseCommand):
+    help = (
+        'Счётчики исполнителей по профессиям и подрегионам: без аргументов — пересчёт '
+        'с исправлением расхождений, --check — только проверка (код выхода 1 при расхождениях)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true')
+
+    def handle(self, *args, **options):
+        drift = find_drift() if options['check'] else recompute()
+        for profession_id, subregion_id, stored, actual in drift:
+            self.stdout.write(
+                f"профессия {profession_id}, подрегион {subregion_id}: "
+                f"было (всего, подтверждено) {stored}, фактически {actual}"
+            )
+        if options['check'] and drift:
+            raise CommandError(f"Расхождений: {len(drift)}")
+        self.stdout.write(f"{'Расхождений' if options['check'] else 'Исправлено'}: {len(drift)}")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.openapi import generate_schema_artifacts, schema_dir
+
+
+class Command(BaseCommand):
+    help = 'Генерирует OpenAPI-схему (JSON и YAML) для раздачи из памяти. Запускать при деплое.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Каталог (по умолчанию settings.OPENAPI_SCHEMA_DIR)')
+
+    def handle(self, *args, **options):
+        output = options['output'] or schema_dir()
+        manifest = generate_schema_artifacts(output)
+        self.stdout.write(f"Схема {manifest['version']} записана в {output}: {manifest['json']}, {manifest['yaml']}")
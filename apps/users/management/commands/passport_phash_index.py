@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from apps.users.models import User
+from core.passport_classifier.phash import to_unsigned
+from core.passport_classifier.tasks import PHASH_SLOTS
+from core.passport_classifier.utils import get_hash_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Индекс перцептивных хэшей фото паспорта: без аргументов — размер, '
+        '--compact — перенос журнала в снимок, --rebuild — пересборка по подтверждённым пользователям'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--compact', action='store_true')
+        parser.add_argument('--rebuild', action='store_true')
+
+    def handle(self, *args, **options):
+        index = get_hash_index()
+
+        if options['rebuild']:
+            fields = [f'{field}_phash' for field in PHASH_SLOTS]
+            rows = User.objects.filter(is_verified=True).values_list('pk', *fields)
+
+            def records():
+                for pk, *hashes in rows.iterator(chunk_size=10000):
+                    for slot, value in enumerate(hashes):
+                        if value is not None:
+                            yield to_unsigned(value), pk, slot
+
+            self.stdout.write(f"Индекс пересобран, записей: {index.rebuild(records())}")
+        elif options['compact']:
+            self.stdout.write(f"Журнал перенесён в снимок, записей: {index.compact()}")
+        else:
+            self.stdout.write(f"Записей в индексе: {len(index)}")
@@ -0,0 +1,89 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _read_cmdline(pid):
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            return f.read().replace(b'\0', b' ').decode(errors='replace').strip()
+    except OSError:
+        return ''
+
+
+def _read_ppid(pid):
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            # Имя процесса в скобках может содержать пробелы
+            return int(f.read().rsplit(')', 1)[1].split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _read_smaps_rollup(pid):
+    """Значения из /proc/<pid>/smaps_rollup в КБ."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return values
+
+
+def find_celery_workers():
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        cmdline = _read_cmdline(entry)
+        if 'celery' in cmdline and 'worker' in cmdline:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+class Command(BaseCommand):
+    help = (
+        'Память процессов Celery-воркера: уникальная (private) и разделяемая (shared) '
+        'по /proc/<pid>/smaps_rollup. Только Linux.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('pids', nargs='*', type=int, help='PID процессов (по умолчанию — все celery worker)')
+
+    def handle(self, *args, **options):
+        if not os.path.isdir('/proc'):
+            raise CommandError('Нужна файловая система /proc (Linux)')
+
+        pids = options['pids'] or find_celery_workers()
+        if not pids:
+            raise CommandError('Процессы celery worker не найдены')
+
+        self.stdout.write(
+            f"{'PID':>7} {'PPID':>7} {'RSS МБ':>9} {'PSS МБ':>9} {'Private МБ':>11} {'Shared МБ':>10}"
+        )
+        totals = {'Rss': 0, 'Pss': 0, 'private': 0, 'shared': 0}
+        for pid in pids:
+            try:
+                m = _read_smaps_rollup(pid)
+            except OSError as e:
+                self.stderr.write(f"{pid}: {e}")
+                continue
+
+            private = m.get('Private_Clean', 0) + m.get('Private_Dirty', 0)
+            shared = m.get('Shared_Clean', 0) + m.get('Shared_Dirty', 0)
+            totals['Rss'] += m.get('Rss', 0)
+            totals['Pss'] += m.get('Pss', 0)
+            totals['private'] += private
+            totals['shared'] += shared
+
+            self.stdout.write(
+                f"{pid:>7} {_read_ppid(pid) or '-':>7} {m.get('Rss', 0) / 1024:>9.1f} "
+                f"{m.get('Pss', 0) / 1024:>9.1f} {private / 1024:>11.1f} {shared / 1024:>10.1f}"
+            )
+
+        # PSS делит разделяемые страницы между процессами — это реальный расход памяти
+        self.stdout.write(
+            f"{'Итого':>15} {totals['Rss'] / 1024:>9.1f} {totals['Pss'] / 1024:>9.1f} "
+            f"{totals['private'] / 1024:>11.1f} {totals['shared'] / 1024:>10.1f}"
+        )
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.users.throttling import get_metrics
+
+
+class Command(BaseCommand):
+    help = 'Счётчики пропущенных и отклонённых запросов по scope троттлинга'
+
+    def handle(self, *args, **options):
+        scopes = settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {})
+        for scope, counts in get_metrics(scopes).items():
+            self.stdout.write(
+                f"{scope:<22} processed={counts['processed']:<8} rejected={counts['rejected']}"
+            )
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_remove_user_username'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PassportPrediction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_version', models.CharField(max_length=64)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('label', models.CharField(max_length=20)),
+                ('probabilities', models.JSONField()),
+                ('last_used_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Предсказание по паспорту',
+                'verbose_name_plural': 'Предсказания по паспортам',
+                'constraints': [models.UniqueConstraint(fields=('model_version', 'content_hash'), name='unique_passport_prediction')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:35
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_passportprediction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PassportUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('field', models.CharField(choices=[('passport_front', 'Лицевая сторона'), ('passport_back', 'Обратная сторона'), ('passport_selfie', 'Селфи с паспортом')], max_length=20)),
+                ('filename', models.CharField(blank=True, max_length=255)),
+                ('size', models.PositiveBigIntegerField()),
+                ('offset', models.PositiveBigIntegerField(default=0)),
+                ('sha256', models.CharField(blank=True, max_length=64)),
+                ('status', models.CharField(choices=[('pending', 'Загружается'), ('completed', 'Завершена')], default='pending', max_length=20)),
+                ('verification_started', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='passport_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Загрузка паспорта',
+                'verbose_name_plural': 'Загрузки паспорта',
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:40
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_passportupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PassportVerification',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('generation', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('queued', 'В очереди'), ('running', 'Выполняется'), ('verified', 'Подтверждён'), ('rejected', 'Отклонён'), ('superseded', 'Заменён новой отправкой'), ('failed', 'Ошибка')], default='queued', max_length=20)),
+                ('results', models.JSONField(blank=True, null=True)),
+                ('model_version', models.CharField(blank=True, max_length=64)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='passport_verifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Проверка паспорта',
+                'verbose_name_plural': 'Проверки паспорта',
+                'indexes': [models.Index(fields=['user', 'generation'], name='passport_verif_user_gen_idx')],
+            },
+        ),
+    ]
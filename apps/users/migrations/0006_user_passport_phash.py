@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_passportverification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='passport_back_phash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='passport_front_phash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='passport_selfie_phash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:51
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+from apps.users.search import drop_search_backend, ensure_search_backend
+
+
+def create_search_backend(apps, schema_editor):
+    ensure_search_backend(schema_editor.connection)
+
+
+def remove_search_backend(apps, schema_editor):
+    drop_search_backend(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0006_user_passport_phash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['phone'], name='users_user_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='users_user_email_lower_idx'),
+        ),
+        # FTS5 с триггерами на SQLite, trigram-индексы на PostgreSQL
+        migrations.RunPython(create_search_backend, remove_search_backend),
+    ]
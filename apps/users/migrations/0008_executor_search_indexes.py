@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0007_user_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'profession', 'subregion', 'is_verified', '-date_joined', '-id'], name='users_executor_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'subregion', 'is_verified', '-date_joined', '-id'], name='users_executor_region_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_executor_counts(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    ExecutorCount = apps.get_model('users', 'ExecutorCount')
+    rows = (
+        User.objects.filter(role__name='исполнитель', profession__isnull=False, subregion__isnull=False)
+        .values('profession_id', 'subregion_id')
+        .annotate(total=Count('id'), verified=Count('id', filter=Q(is_verified=True)))
+        .order_by()
+    )
+    ExecutorCount.objects.bulk_create([ExecutorCount(**row) for row in rows])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_executor_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExecutorCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.IntegerField(default=0)),
+                ('verified', models.IntegerField(default=0)),
+                ('profession', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='executor_counts', to='users.profession')),
+                ('subregion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='executor_counts', to='users.usersubregion')),
+            ],
+            options={
+                'verbose_name': 'Число исполнителей',
+                'verbose_name_plural': 'Число исполнителей',
+                'constraints': [models.UniqueConstraint(fields=('profession', 'subregion'), name='unique_executor_count')],
+            },
+        ),
+        migrations.RunPython(fill_executor_counts, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,7 @@
+import uuid
 from django.contrib.auth.models import AbstractUser, BaseUserManager, PermissionsMixin
 from django.db import models
+from django.db.models.functions import Lower
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -69,6 +71,10 @@ class User(AbstractUser, PermissionsMixin):
     passport_front = models.ImageField(upload_to='passport/front/', null=True, blank=True)
     passport_back = models.ImageField(upload_to='passport/back/', null=True, blank=True)
     passport_selfie = models.ImageField(upload_to='passport/selfie/', null=True, blank=True)
+    # 64-битные перцептивные хэши фото паспорта (core/passport_classifier/phash.py)
+    passport_front_phash = models.BigIntegerField(null=True, blank=True, editable=False)
+    passport_back_phash = models.BigIntegerField(null=True, blank=True, editable=False)
+    passport_selfie_phash = models.BigIntegerField(null=True, blank=True, editable=False)
 
     objects = CustomUserManager()
 
@@ -78,3 +84,127 @@ class User(AbstractUser, PermissionsMixin):
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
+        # Поиск по префиксу телефона и email в админке (apps/users/search.py)
+        indexes = [
+            models.Index(fields=['phone'], name='users_user_phone_idx'),
+            models.Index(Lower('email'), name='users_user_email_lower_idx'),
+            # Каталог исполнителей (/executors/): фильтры по равенству, затем порядок по date_joined
+            models.Index(
+                fields=['role', 'profession', 'subregion', 'is_verified', '-date_joined', '-id'],
+                name='users_executor_search_idx',
+            ),
+            # Тот же поиск без профессии — только по подрегиону/региону
+            models.Index(
+                fields=['role', 'subregion', 'is_verified', '-date_joined', '-id'],
+                name='users_executor_region_idx',
+            ),
+        ]
+
+class PassportPrediction(models.Model):
+    """Кэш предсказаний классификатора паспортов по хэшу содержимого изображения."""
+    model_version = models.CharField(max_length=64)
+    content_hash = models.CharField(max_length=64)
+    label = models.CharField(max_length=20)
+    probabilities = models.JSONField()
+    last_used_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = 'Предсказание по паспорту'
+        verbose_name_plural = 'Предсказания по паспортам'
+        constraints = [
+            models.UniqueConstraint(fields=['model_version', 'content_hash'], name='unique_passport_prediction'),
+        ]
+
+class PassportUpload(models.Model):
+    """Возобновляемая загрузка фото паспорта частями (см. apps/users/chunked_upload.py)."""
+    STATUS_PENDING = 'pending'
+    STATUS_COMPLETED = 'completed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Загружается'),
+        (STATUS_COMPLETED, 'Завершена'),
+    ]
+    FIELD_CHOICES = [
+        ('passport_front', 'Лицевая сторона'),
+        ('passport_back', 'Обратная сторона'),
+        ('passport_selfie', 'Селфи с паспортом'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='passport_uploads')
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    filename = models.CharField(max_length=255, blank=True)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    # Завершённые загрузки всех трёх сторон запускают проверку один раз
+    verification_started = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Загрузка паспорта'
+        verbose_name_plural = 'Загрузки паспорта'
+
+class PassportVerification(models.Model):
+    """
+    Задание на проверку паспорта. Создаётся при каждой отправке, задача Celery
+    обновляет его одиночными update() (см. apps/users/verification.py).
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_VERIFIED = 'verified'
+    STATUS_REJECTED = 'rejected'
+    STATUS_SUPERSEDED = 'superseded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'В очереди'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_VERIFIED, 'Подтверждён'),
+        (STATUS_REJECTED, 'Отклонён'),
+        (STATUS_SUPERSEDED, 'Заменён новой отправкой'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+    FINAL_STATUSES = (STATUS_VERIFIED, STATUS_REJECTED, STATUS_SUPERSEDED, STATUS_FAILED)
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # При отклонении пользователь удаляется, результат проверки остаётся
+    user = models.ForeignKey(
+        User, null=True, on_delete=models.SET_NULL, related_name='passport_verifications'
+    )
+    generation = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    # {'face': {'label': ..., 'probabilities': {...}, 'ok': ...}, 'front': ..., 'back': ...}
+    results = models.JSONField(null=True, blank=True)
+    model_version = models.CharField(max_length=64, blank=True)
+    error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # update() не трогает auto_now — задача выставляет время сама, от него зависит ETag
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Проверка паспорта'
+        verbose_name_plural = 'Проверки паспорта'
+        indexes = [
+            models.Index(fields=['user', 'generation'], name='passport_verif_user_gen_idx'),
+        ]
+
+class ExecutorCount(models.Model):
+    """
+    Число исполнителей по паре (профессия, подрегион). Поддерживается
+    инкрементально при изменении пользователей (см. apps/users/executor_counts.py).
+    """
+    profession = models.ForeignKey(Profession, on_delete=models.CASCADE, related_name='executor_counts')
+    subregion = models.ForeignKey(UserSubRegion, on_delete=models.CASCADE, related_name='executor_counts')
+    # Не Positive: расхождение не должно ломать сохранение пользователя, его исправит пересчёт
+    total = models.IntegerField(default=0)
+    verified = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Число исполнителей'
+        verbose_name_plural = 'Число исполнителей'
+        constraints = [
+            models.UniqueConstraint(fields=['profession', 'subregion'], name='unique_executor_count'),
+        ]
@@ -0,0 +1,55 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination
+
+# Пагинация больших таблиц без точного COUNT(*):
+# без фильтров число строк берётся из статистики СУБД (pg_class.reltuples)
+# или как MAX(id) в SQLite — оба запроса не читают таблицу; с фильтрами
+# подсчёт ограничен COUNT_LIMIT строками.
+
+
+class EstimatedCountPaginator(Paginator):
+    # Ниже этого порога точный COUNT(*) дешёвый
+    EXACT_COUNT_THRESHOLD = 10000
+    COUNT_LIMIT = 10000
+
+    def _estimate_table_rows(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        table = queryset.model._meta.db_table
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            elif connection.vendor == 'sqlite':
+                cursor.execute(f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+            else:
+                return None
+            row = cursor.fetchone()
+        return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return super().count
+
+        if not queryset.query.where:
+            estimate = self._estimate_table_rows()
+            if estimate is not None and estimate > self.EXACT_COUNT_THRESHOLD:
+                return estimate
+            return super().count
+
+        # Отфильтрованный список: считаем не дальше COUNT_LIMIT строк
+        return queryset.order_by()[:self.COUNT_LIMIT].count()
+
+
+class ExecutorCursorPagination(CursorPagination):
+    """
+    Keyset-пагинация каталога исполнителей: страница — WHERE date_joined < курсор
+    по индексу, без OFFSET и COUNT(*). Время ответа не зависит от номера страницы.
+    """
+    ordering = ('-date_joined', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
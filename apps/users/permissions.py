@@ -1,10 +1,40 @@
 from rest_framework.permissions import BasePermission
 
+
+def get_role_name(user):
+    # У ClaimsUser role — строка из токена, у модели User — объект UserRole
+    role = getattr(user, 'role', None)
+    return getattr(role, 'name', role)
+
+
 class IsCustomerPermission(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role == 'заказчик'
+        return request.user.is_authenticated and get_role_name(request.user) == 'заказчик'
 
 
 class IsExecutorPermission(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role == 'исполнитель'
\ No newline at end of file
+        return request.user.is_authenticated and get_role_name(request.user) == 'исполнитель'
+
+
+PASSPORT_MEDIA_PREFIX = 'passport/'
+
+
+def can_view_media(user, name):
+    """
+    Доступ к файлу MEDIA_ROOT по имени: фото паспорта — только владельцу и
+    персоналу, артефакты классификатора (.npy) — только персоналу.
+    """
+    if not name.startswith(PASSPORT_MEDIA_PREFIX):
+        return True
+    if not user.is_authenticated:
+        return False
+    if getattr(user, 'is_staff', False):
+        return True
+
+    from django.db.models import Q
+    from apps.users.models import User
+
+    return User.objects.filter(
+        Q(passport_front=name) | Q(passport_back=name) | Q(passport_selfie=name), pk=user.pk,
+    ).exists()
@@ -0,0 +1,180 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+# Справочники (регионы, подрегионы, профессии, роли) меняются редко, а читаются
+# при каждом запуске приложения. Для каждой таблицы в общем кэше хранится
+# счётчик версии, его увеличивают сигналы post_save/post_delete после коммита (см. signals.py).
+# По версиям строится ETag, а отрендеренные ответы хранятся в памяти процесса.
+# Если общий кэш недоступен, ответы отдаются без кэширования.
+
+REGIONS = 'regions'
+SUBREGIONS = 'subregions'
+PROFESSIONS = 'professions'
+ROLES = 'roles'
+# Не таблица-справочник: версия счётчиков исполнителей (apps/users/executor_counts.py)
+EXECUTOR_COUNTS = 'executor_counts'
+
+VERSION_KEY = 'reference:version:{}'
+
+
+def _initial_version():
+    # Не начинаем с 1: после очистки кэша версии не должны совпасть со старыми
+    return int(time.time() * 1000)
+
+
+def get_versions(tables):
+    keys = [VERSION_KEY.format(table) for table in tables]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+def bump_version(table):
+    key = VERSION_KEY.format(table)
+    try:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), timeout=None)
+    except Exception:
+        # Вызывается после коммита: ошибка кэша не должна превращать запись в 500
+        logger.exception("Не удалось обновить версию справочника %s", table)
+
+
+def _get_versions_or_none(tables):
+    try:
+        return get_versions(tables)
+    except Exception:
+        logger.warning("Кэш версий справочников недоступен", exc_info=True)
+        return None
+
+
+class _RenderedCache:
+    """LRU отрендеренных ответов в памяти процесса. Версии входят в ключ, поэтому
+    устаревшие записи просто перестают запрашиваться и вытесняются."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+rendered_cache = _RenderedCache(getattr(settings, 'REFERENCE_CACHE_MAX_ENTRIES', 512))
+
+
+def _etag_matches(request, etag):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(',')]
+    return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
+
+class CachedReferenceMixin:
+    """
+    Для list/retrieve справочных ViewSet'ов: ETag по версиям таблиц,
+    304 на If-None-Match и кэш отрендеренного JSON в памяти процесса.
+    reference_tables — таблицы, от которых зависит ответ.
+    """
+
+    reference_tables = ()
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(request, super().retrieve, *args, **kwargs)
+
+    def _cached_response(self, request, handler, *args, **kwargs):
+        renderer_format = request.accepted_renderer.format
+        # Browsable API содержит CSRF-токен и данные пользователя — не кэшируем
+        if renderer_format != 'json':
+            return handler(request, *args, **kwargs)
+
+        versions = _get_versions_or_none(self.reference_tables)
+        if versions is None:
+            return handler(request, *args, **kwargs)
+
+        # Хост и схема входят в ключ: ссылки в ответе (next/previous) абсолютные
+        key = (
+            request.scheme, request.get_host(), request.path,
+            request.META.get('QUERY_STRING', ''), renderer_format, versions,
+        )
+        etag = '"%s"' % hashlib.sha1(repr(key).encode()).hexdigest()
+        headers = {
+            'ETag': etag,
+            'Cache-Control': f"public, max-age={getattr(settings, 'REFERENCE_CACHE_MAX_AGE', 60)}",
+        }
+
+        if _etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        cached = rendered_cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type, headers=headers)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code != status.HTTP_200_OK:
+            return response
+
+        response.accepted_renderer = request.accepted_renderer
+        response.accepted_media_type = request.accepted_media_type
+        response.renderer_context = self.get_renderer_context()
+        response.render()
+        rendered_cache.set(key, (response.content, response['Content-Type']))
+
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+
+_role_ids = {}
+
+
+def get_role_id(name):
+    """id роли по имени (UserRole.name) или None. Кэш процесса привязан к версии таблицы ролей."""
+    from apps.users.models import UserRole
+
+    versions = _get_versions_or_none([ROLES])
+    if versions is None:
+        return UserRole.objects.filter(name=name).values_list('id', flat=True).first()
+
+    key = (name, versions[0])
+    if key not in _role_ids:
+        if len(_role_ids) > 64:
+            _role_ids.clear()
+        _role_ids[key] = UserRole.objects.filter(name=name).values_list('id', flat=True).first()
+    return _role_ids[key]
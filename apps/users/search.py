@@ -0,0 +1,123 @@
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Lower
+
+# Поиск пользователей в админке без сканирования всей таблицы:
+#   телефон и email — поиск по префиксу как диапазон [префикс, префикс + U+FFFF)
+#   по B-tree индексам phone и LOWER(email);
+#   остальное — полнотекстовый поиск: FTS5 на SQLite (внешняя таблица users_user_fts,
+#   поддерживается триггерами), на PostgreSQL — icontains по trigram GIN-индексам.
+# Таблица и триггеры создаются миграцией и проверяются после каждого migrate:
+# пересборка users_user при изменении схемы в SQLite удаляет триггеры.
+
+FTS_TABLE = 'users_user_fts'
+
+SQLITE_FTS = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        email, full_name, phone,
+        content='users_user', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON users_user BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, email, full_name, phone)
+        VALUES (new.id, new.email, new.full_name, new.phone);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON users_user BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, email, full_name, phone)
+        VALUES ('delete', old.id, old.email, old.full_name, old.phone);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF email, full_name, phone ON users_user BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, email, full_name, phone)
+        VALUES ('delete', old.id, old.email, old.full_name, old.phone);
+        INSERT INTO {FTS_TABLE}(rowid, email, full_name, phone)
+        VALUES (new.id, new.email, new.full_name, new.phone);
+    END
+    """,
+]
+
+# icontains в PostgreSQL — UPPER(col::text) LIKE UPPER(%s), индекс строится по тому же выражению
+POSTGRESQL_TRIGRAM = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS users_user_full_name_trgm ON users_user USING gin (UPPER(full_name::text) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS users_user_email_trgm ON users_user USING gin (UPPER(email::text) gin_trgm_ops)',
+]
+
+PHONE_RE = re.compile(r'^\+?[\d\s\-()]{3,}$')
+PREFIX_END = '\uffff'
+
+
+def ensure_search_backend(connection):
+    """Создаёт недостающие таблицу FTS5, триггеры или trigram-индексы. Идемпотентна."""
+    if 'users_user' not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+                [f'{FTS_TABLE}_a_'],
+            )
+            triggers = cursor.fetchone()[0]
+            for statement in SQLITE_FTS:
+                cursor.execute(statement)
+            if triggers < 3:
+                # Триггеров не было — индекс мог отстать от таблицы
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        elif connection.vendor == 'postgresql':
+            for statement in POSTGRESQL_TRIGRAM:
+                cursor.execute(statement)
+
+
+def drop_search_backend(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        elif connection.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS users_user_full_name_trgm')
+            cursor.execute('DROP INDEX IF EXISTS users_user_email_trgm')
+
+
+def _fts_query(term):
+    tokens = re.findall(r'\w+', term)
+    # Каждое слово — префиксный запрос, слова объединяются через AND
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_users(queryset, term):
+    """
+    Фильтрует queryset пользователей по строке поиска. Возвращает None, если
+    для СУБД нет индексированного поиска (тогда работает стандартный поиск админки).
+    """
+    term = term.strip()
+    if not term:
+        return queryset
+
+    if '@' in term:
+        prefix = term.lower()
+        return queryset.alias(email_lower=Lower('email')).filter(
+            email_lower__gte=prefix, email_lower__lt=prefix + PREFIX_END,
+        )
+    if PHONE_RE.match(term):
+        return queryset.filter(phone__gte=term, phone__lt=term + PREFIX_END)
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        query = _fts_query(term)
+        if not query:
+            return queryset.none()
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [query],
+        ))
+    if vendor == 'postgresql':
+        return queryset.filter(Q(full_name__icontains=term) | Q(email__icontains=term))
+    return None
@@ -1,8 +1,13 @@
 from rest_framework import serializers
-from .models import User, UserRegion, UserSubRegion, Profession, UserRole
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.conf import settings
+from .models import User, UserRegion, UserSubRegion, Profession, UserRole, PassportUpload, PassportVerification, ExecutorCount
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth import get_user_model
+from apps.users.authentication import set_user_claims
+from apps.users.uploads import normalize_passport_image, save_inference_artifacts
 
 UserModel = get_user_model()
 
@@ -16,14 +21,18 @@ class CustomTokenObtainPairSerializer(serializers.Serializer):
         password = attrs.get('password')
 
         try:
-            user = UserModel.objects.get(email=email)
+            user = UserModel.objects.select_related('role').get(email=email)
         except UserModel.DoesNotExist:
+            # Хэшируем пароль и для несуществующего email, чтобы время ответа
+            # не выдавало, зарегистрирован ли адрес
+            UserModel().set_password(password)
             raise AuthenticationFailed('Неверный email или пароль')
 
         if not user.check_password(password) or not user.is_active:
             raise AuthenticationFailed('Неверный email или пароль')
 
-        refresh = RefreshToken.for_user(user)
+        # Claims переходят в access-токен, см. ClaimsJWTAuthentication
+        refresh = set_user_claims(RefreshToken.for_user(user), user)
 
         return {
             'refresh': str(refresh),
@@ -36,6 +45,18 @@ class CustomTokenObtainPairSerializer(serializers.Serializer):
             }
         }
 
+# Обновление access-токена: claims берутся из БД, а не копируются из refresh-токена
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = AccessToken(data['access'])
+        try:
+            user = UserModel.objects.select_related('role').get(pk=access[api_settings.USER_ID_CLAIM])
+        except UserModel.DoesNotExist:
+            raise AuthenticationFailed('Пользователь не найден')
+        data['access'] = str(set_user_claims(access, user))
+        return data
+
 # Регистрация
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -80,8 +101,82 @@ class SubRegionSerializer(serializers.ModelSerializer):
         model = UserSubRegion
         fields = ['id', 'title', 'region']
 
+class NestedSubRegionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserSubRegion
+        fields = ['id', 'title']
+
+class RegionTreeSerializer(serializers.ModelSerializer):
+    subregions = NestedSubRegionSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = UserRegion
+        fields = ['id', 'title', 'subregions']
+
+# Каталог исполнителей
+class ExecutorSerializer(serializers.ModelSerializer):
+    profession = ProfessionSerializer(read_only=True)
+    subregion = SubRegionSerializer(read_only=True)
+
+    class Meta:
+        model = User
+        fields = ['id', 'full_name', 'is_verified', 'profession', 'subregion']
+
+# Число исполнителей по профессии и подрегиону
+class ExecutorCountSerializer(serializers.ModelSerializer):
+    region = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = ExecutorCount
+        fields = ['profession', 'subregion', 'region', 'total', 'verified']
+
+# Все справочники одним ответом
+class ReferenceDataSerializer(serializers.Serializer):
+    regions = RegionTreeSerializer(many=True)
+    professions = ProfessionSerializer(many=True)
+    roles = UserRoleSerializer(many=True)
+
 # Паспортные документы
 class UploadDocumentsSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['passport_front', 'passport_back', 'passport_selfie']
+
+    # Изображения перекодируются при валидации, см. apps/users/uploads.py
+    def validate_passport_front(self, value):
+        return normalize_passport_image(value) if value else value
+
+    def validate_passport_back(self, value):
+        return normalize_passport_image(value) if value else value
+
+    def validate_passport_selfie(self, value):
+        return normalize_passport_image(value) if value else value
+
+    def update(self, instance, validated_data):
+        instance = super().update(instance, validated_data)
+        save_inference_artifacts(instance, validated_data)
+        return instance
+
+
+# Возобновляемая загрузка фото паспорта
+class PassportUploadInitSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PassportUpload
+        fields = ['field', 'filename', 'size', 'sha256']
+
+    def validate_size(self, value):
+        max_bytes = getattr(settings, 'PASSPORT_UPLOAD_MAX_BYTES', 20 * 1024 * 1024)
+        if value <= 0 or value > max_bytes:
+            raise serializers.ValidationError(f'Размер должен быть от 1 байта до {max_bytes} байт')
+        return value
+
+class PassportUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PassportUpload
+        fields = ['id', 'field', 'size', 'offset', 'status', 'created_at']
+
+
+class PassportVerificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PassportVerification
+        fields = ['id', 'status', 'results', 'model_version', 'error', 'created_at', 'started_at', 'finished_at']
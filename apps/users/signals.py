@@ -0,0 +1,146 @@
+import logging
+
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_init, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.users import executor_counts, reference
+from apps.users.authentication import CLAIM_FIELDS, invalidate_user_claims
+from apps.users.models import PassportVerification, Profession, User, UserRegion, UserRole, UserSubRegion
+from apps.users.search import ensure_search_backend
+
+logger = logging.getLogger(__name__)
+
+CLAIM_UPDATE_FIELDS = {'role', 'role_id', 'is_verified', 'is_active', 'is_staff', 'is_superuser'}
+
+REFERENCE_TABLES = {
+    UserRegion: reference.REGIONS,
+    UserSubRegion: reference.SUBREGIONS,
+    Profession: reference.PROFESSIONS,
+    UserRole: reference.ROLES,
+}
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_reference_version(sender, **kwargs):
+    table = REFERENCE_TABLES.get(sender)
+    if table is not None:
+        # Только после коммита: иначе параллельный GET закэширует старые строки под новой версией
+        transaction.on_commit(lambda: reference.bump_version(table))
+
+
+def _claims_state(instance):
+    values = instance.__dict__
+    if all(field in values for field in CLAIM_FIELDS):
+        return tuple(values[field] for field in CLAIM_FIELDS)
+    return None
+
+
+@receiver(post_init, sender=User)
+def remember_claims_state(sender, instance, **kwargs):
+    instance._claims_state = _claims_state(instance)
+
+
+@receiver(post_save, sender=User)
+def invalidate_token_claims(sender, instance, created, update_fields=None, **kwargs):
+    # Токенов у нового пользователя ещё нет; остальные сохранения сбрасывают
+    # claims, только если изменились роль, верификация или активность
+    if created or (update_fields is not None and not CLAIM_UPDATE_FIELDS & update_fields):
+        return
+    state = _claims_state(instance)
+    if instance._claims_state is None or state != instance._claims_state:
+        invalidate_user_claims(instance.pk)
+    instance._claims_state = state
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user_claims(sender, instance, **kwargs):
+    invalidate_user_claims(instance.pk)
+
+
+def _remove_from_hash_index(user_id):
+    from core.passport_classifier.utils import get_hash_index
+
+    try:
+        get_hash_index().remove(user_id)
+    except OSError:
+        logger.exception("Не удалось удалить хэши фото пользователя %s из индекса", user_id)
+
+
+@receiver(post_delete, sender=User)
+def remove_deleted_user_hashes(sender, instance, **kwargs):
+    # В индексе только подтверждённые пользователи (core/passport_classifier/tasks.py):
+    # иначе новые отправки совпадали бы с фото удалённого аккаунта
+    if instance.__dict__.get('is_verified', True):
+        user_id = instance.pk
+        transaction.on_commit(lambda: _remove_from_hash_index(user_id))
+
+
+@receiver(pre_delete, sender=User)
+def fail_unfinished_verifications(sender, instance, **kwargs):
+    # После удаления user_id у проверок обнуляется (SET_NULL) и задача уже не найдёт
+    # свою запись — незавершённые проверки закрываем до этого, в той же транзакции
+    now = timezone.now()
+    PassportVerification.objects.filter(
+        user_id=instance.pk,
+        status__in=[PassportVerification.STATUS_QUEUED, PassportVerification.STATUS_RUNNING],
+    ).update(
+        status=PassportVerification.STATUS_FAILED, error='Пользователь удалён', finished_at=now, updated_at=now,
+    )
+
+
+# Счётчики исполнителей: прежнее состояние пользователя читается из базы перед
+# save()/delete() (объект в памяти мог устареть: mark_verified меняет строку
+# через update()) и сравнивается с записанным
+COUNTED_UPDATE_FIELDS = {
+    'role', 'role_id', 'profession', 'profession_id', 'subregion', 'subregion_id', 'is_verified',
+}
+
+
+def _affects_counts(update_fields):
+    return update_fields is None or bool(COUNTED_UPDATE_FIELDS & update_fields)
+
+
+@receiver(pre_save, sender=User)
+def load_executor_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._executor_state = None
+    if not raw and instance.pk is not None and not instance._state.adding and _affects_counts(update_fields):
+        instance._executor_state = executor_counts.load_state(instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def reload_executor_state(sender, instance, **kwargs):
+    instance._executor_state = executor_counts.load_state(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def update_executor_counts(sender, instance, created, raw, update_fields=None, **kwargs):
+    if raw or not _affects_counts(update_fields):
+        return
+    old = None if created else instance._executor_state
+    new = {}
+    for field in executor_counts.TRACKED_FIELDS:
+        written = update_fields is None or {field, field.removesuffix('_id')} & update_fields
+        new[field] = instance.__dict__.get(field) if written or old is None else old[field]
+    executor_counts.apply_change(executor_counts.counted_key(old), executor_counts.counted_key(new))
+
+
+@receiver(post_delete, sender=User)
+def remove_from_executor_counts(sender, instance, **kwargs):
+    executor_counts.apply_change(executor_counts.counted_key(instance._executor_state), None)
+
+
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+def recompute_executor_counts(sender, **kwargs):
+    # Переименование или удаление роли меняет состав исполнителей целиком (редкая операция в админке)
+    transaction.on_commit(executor_counts.recompute)
+
+
+@receiver(post_migrate)
+def restore_user_search(sender, using, **kwargs):
+    # В SQLite миграции, пересоздающие users_user, удаляют триггеры FTS5
+    if sender.name == 'apps.users':
+        ensure_search_backend(connections[using])
@@ -0,0 +1,30 @@
+from smtplib import SMTPException
+
+from celery import shared_task
+from celery.signals import worker_process_shutdown
+
+from apps.users import mail
+
+
+@worker_process_shutdown.connect
+def close_mail_connection(**kwargs):
+    mail.close_connection()
+
+
+# Повторяются только временные ошибки: на отказ 5xx (несуществующий адрес,
+# отклонённый отправитель) задача сразу завершается PermanentEmailError
+@shared_task(
+    autoretry_for=(SMTPException, OSError),
+    retry_backoff=True,
+    retry_backoff_max=600,
+    retry_jitter=True,
+    max_retries=8,
+)
+def send_verification_email_task(email, code):
+    try:
+        mail.send_messages([mail.verification_email(email, code)])
+    except SMTPException as e:
+        if mail.is_permanent_error(e):
+            raise mail.PermanentEmailError(f"Письмо на {email} отклонено: {e}") from e
+        raise
+
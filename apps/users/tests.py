@@ -1,3 +1,598 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from smtplib import SMTPRecipientsRefused, SMTPResponseException, SMTPSenderRefused
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail as outbox
+from django.core.cache import caches
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.users import mail, verification
+from apps.users.authentication import CLAIMS_AT_CLAIM, ClaimsJWTAuthentication, ClaimsUser, set_user_claims
+from apps.users.chunked_upload import part_path
+from apps.users.executor_counts import actual_counts, find_drift, mark_verified
+from apps.users.models import (
+    ExecutorCount, PassportUpload, PassportVerification, Profession, User, UserRegion, UserRole, UserSubRegion,
+)
+from apps.users.reference import rendered_cache
+from apps.users.search import search_users
+from apps.users.tasks import send_verification_email_task
+from apps.users.throttling import IPThrottle
+from apps.users.verification import PENDING_KEY, claim_generation, next_generation
+from core.db_router import PRIMARY, REPLICA, PrimaryReplicaRouter, read_from_replica
+from core.passport_classifier import tasks as passport_tasks
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+    'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-local'},
+}
+
+# Redis на закрытом порту: любое обращение к кэшу падает с ошибкой соединения
+UNAVAILABLE_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:1/0'},
+    'local': LOCMEM_CACHES['local'],
+}
+
+
+# Primary и реплика — два соединения к файловой тестовой SQLite (реплика зеркалирует default)
+@override_settings(CACHES=LOCMEM_CACHES)
+class PrimaryReplicaRouterTests(TransactionTestCase):
+    databases = {PRIMARY, REPLICA}
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_reads_go_to_primary_outside_replica_context(self):
+        router = PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(Profession), PRIMARY)
+        with read_from_replica():
+            self.assertEqual(router.db_for_read(Profession), REPLICA)
+            self.assertEqual(router.db_for_write(Profession), PRIMARY)
+
+    def test_reference_get_reads_from_replica(self):
+        Profession.objects.create(title='Сантехник')
+
+        with CaptureQueriesContext(connections[PRIMARY]) as primary, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = APIClient().get('/api/v1/users/professions/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['title'] for p in response.json()['results']], ['Сантехник'])
+        self.assertTrue(replica.captured_queries)
+        self.assertFalse(primary.captured_queries)
+
+    def test_writes_go_to_primary(self):
+        with read_from_replica():
+            with CaptureQueriesContext(connections[PRIMARY]) as primary, \
+                    CaptureQueriesContext(connections[REPLICA]) as replica:
+                Profession.objects.create(title='Электрик')
+
+        self.assertTrue(any(q['sql'].startswith('INSERT') for q in primary.captured_queries))
+        self.assertFalse(replica.captured_queries)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class VerificationEmailTaskTests(SimpleTestCase):
+    def setUp(self):
+        mail.close_connection()
+
+    def tearDown(self):
+        mail.close_connection()
+
+    def test_sends_code(self):
+        send_verification_email_task.apply(args=['user@example.kg', 123456]).get()
+
+        self.assertEqual(len(outbox.outbox), 1)
+        self.assertEqual(outbox.outbox[0].to, ['user@example.kg'])
+        self.assertIn('123456', outbox.outbox[0].body)
+
+    def test_reuses_connection_between_tasks(self):
+        send_verification_email_task.apply(args=['a@example.kg', 1]).get()
+        connection = mail._connection
+        send_verification_email_task.apply(args=['b@example.kg', 2]).get()
+
+        self.assertIs(mail._connection, connection)
+        self.assertEqual([m.to for m in outbox.outbox], [['a@example.kg'], ['b@example.kg']])
+
+    def send_with_errors(self, *errors):
+        with mock.patch.object(mail, 'send_messages', side_effect=[*errors, 1]) as send:
+            result = send_verification_email_task.apply(args=['user@example.kg', 1])
+        return result, send.call_count
+
+    def test_transient_errors_are_retried(self):
+        result, calls = self.send_with_errors(
+            SMTPResponseException(421, b'Try again later'),
+            SMTPRecipientsRefused({'user@example.kg': (450, b'Mailbox busy')}),
+        )
+
+        self.assertTrue(result.successful())
+        self.assertEqual(calls, 3)
+
+    def test_permanent_errors_are_not_retried(self):
+        for error in (
+            SMTPRecipientsRefused({'user@example.kg': (550, b'No such user')}),
+            SMTPSenderRefused(553, b'Sender rejected', 'noreply@example.kg'),
+            SMTPResponseException(554, b'Rejected'),
+        ):
+            with self.subTest(error=type(error).__name__):
+                result, calls = self.send_with_errors(error)
+
+                self.assertIsInstance(result.result, mail.PermanentEmailError)
+                self.assertEqual(calls, 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ClaimGenerationTests(SimpleTestCase):
+    user_id = 42
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def _enqueue(self, token):
+        generation = next_generation(self.user_id)
+        caches['default'].set(PENDING_KEY.format(self.user_id), token)
+        return generation
+
+    def test_task_adopts_latest_generation(self):
+        self._enqueue('t1')
+        latest = next_generation(self.user_id)
+
+        self.assertEqual(claim_generation(self.user_id, 1, 't1'), latest)
+
+    def test_redelivered_task_keeps_claimed_generation(self):
+        self._enqueue('t1')
+        latest = next_generation(self.user_id)
+        claim_generation(self.user_id, 1, 't1')
+
+        # Сообщение доставлено снова после падения воркера
+        self.assertEqual(claim_generation(self.user_id, 1, 't1'), latest)
+
+    def test_submission_during_claim_is_not_lost(self):
+        self._enqueue('t1')
+        delete = verification.cache.delete
+        submitted = []
+
+        def submit_then_delete(key, *args, **kwargs):
+            # Отправка приходит, пока ключ pending ещё стоит: в очередь она не попадает
+            if key == PENDING_KEY.format(self.user_id) and not submitted:
+                submitted.append(next_generation(self.user_id))
+                self.assertFalse(caches['default'].add(key, 't2'))
+            return delete(key, *args, **kwargs)
+
+        with mock.patch.object(verification.cache, 'delete', side_effect=submit_then_delete):
+            claimed = claim_generation(self.user_id, 1, 't1')
+
+        # Задача проверяет поколение этой отправки, а не выбрасывает результат как устаревший
+        self.assertEqual(claimed, submitted[0])
+        self.assertTrue(verification.is_current_generation(self.user_id, claimed))
+
+    def test_redelivered_task_is_stale_after_new_submission(self):
+        self._enqueue('t1')
+        claim_generation(self.user_id, 1, 't1')
+        self._enqueue('t2')
+
+        self.assertIsNone(claim_generation(self.user_id, 1, 't1'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.executor = UserRole.objects.create(name='исполнитель')
+        self.customer = UserRole.objects.create(name='заказчик')
+        self.user = User.objects.create(email='claims@example.kg', full_name='Claims', role=self.executor)
+        self.token = set_user_claims(AccessToken.for_user(self.user), self.user)
+
+    def authenticate(self):
+        return ClaimsJWTAuthentication().get_user(self.token)
+
+    def test_unrelated_save_keeps_claims(self):
+        self.user.profession = Profession.objects.create(title='Сантехник')
+        self.user.save()
+
+        self.assertIsInstance(self.authenticate(), ClaimsUser)
+
+    def test_role_change_falls_back_to_db_with_role(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.role = self.customer
+        user.save()
+
+        authenticated = self.authenticate()
+        self.assertIsInstance(authenticated, User)
+        with self.assertNumQueries(0):
+            self.assertEqual(authenticated.role.name, 'заказчик')
+
+    @override_settings(CACHES=UNAVAILABLE_CACHES)
+    def test_unavailable_cache_falls_back_to_db(self):
+        with self.assertLogs('apps.users.authentication', 'WARNING'):
+            self.assertIsInstance(self.authenticate(), User)
+
+    def test_staff_flag_is_a_claim(self):
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.user.refresh_from_db()
+        self.token = set_user_claims(AccessToken.for_user(self.user), self.user)
+
+        authenticated = self.authenticate()
+        self.assertIsInstance(authenticated, ClaimsUser)
+        self.assertTrue(authenticated.is_staff)
+
+    def test_expired_claims_are_checked_in_db(self):
+        self.token[CLAIMS_AT_CLAIM] -= 16 * 60
+        self.assertIsInstance(self.authenticate(), User)
+
+    def test_deleted_user_rejected_after_lost_invalidation(self):
+        User.objects.filter(pk=self.user.pk).delete()
+        # Запись об удалении потеряна (перезапуск Redis)
+        caches['default'].clear()
+        self.token[CLAIMS_AT_CLAIM] -= 16 * 60
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+
+def jpeg_bytes(size=(800, 600), color=(120, 60, 30)):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        settings = override_settings(
+            MEDIA_ROOT=os.path.join(self.tmp, 'media'),
+            PASSPORT_CHUNKED_UPLOAD_DIR=os.path.join(self.tmp, 'parts'),
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = User.objects.create(email='upload@example.kg', full_name='Upload')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.data = jpeg_bytes()
+
+    def init(self, sha256=None):
+        response = self.client.post('/api/v1/users/uploads/', {
+            'field': 'passport_front', 'size': len(self.data), 'sha256': sha256 or hashlib.sha256(self.data).hexdigest(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+    def put(self, upload_id, offset, chunk, checksum=None):
+        return self.client.put(
+            f'/api/v1/users/uploads/{upload_id}/', data=chunk, content_type='application/octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset), HTTP_UPLOAD_CHECKSUM=checksum or hashlib.sha256(chunk).hexdigest(),
+        )
+
+    def upload_all(self, upload_id, chunk_size=1000):
+        for offset in range(0, len(self.data), chunk_size):
+            response = self.put(upload_id, offset, self.data[offset:offset + chunk_size])
+            self.assertEqual(response.status_code, 200)
+
+    def complete(self, upload_id):
+        return self.client.post(f'/api/v1/users/uploads/{upload_id}/complete/')
+
+    def test_upload_and_complete(self):
+        upload_id = self.init()
+        self.upload_all(upload_id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.complete(upload_id)
+        self.assertEqual(response.status_code, 200)
+        upload = PassportUpload.objects.get(id=upload_id)
+        self.assertEqual(upload.status, PassportUpload.STATUS_COMPLETED)
+        self.assertFalse(os.path.exists(part_path(upload)))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.passport_front)
+
+    def test_repeated_complete_returns_same_result(self):
+        upload_id = self.init()
+        self.upload_all(upload_id)
+        first = self.complete(upload_id)
+
+        second = self.complete(upload_id)
+        self.assertEqual((second.status_code, second.json()), (first.status_code, first.json()))
+
+    def test_wrong_offset_is_rejected(self):
+        upload_id = self.init()
+        self.put(upload_id, 0, self.data[:1000])
+
+        response = self.put(upload_id, 500, self.data[500:1500])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '1000')
+
+    def test_chunk_checksum_mismatch_is_rejected(self):
+        upload_id = self.init()
+
+        response = self.put(upload_id, 0, self.data[:1000], checksum='0' * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(PassportUpload.objects.get(id=upload_id).offset, 0)
+
+    def test_lost_part_file_rewinds_offset(self):
+        upload_id = self.init()
+        self.put(upload_id, 0, self.data[:1000])
+        os.remove(part_path(PassportUpload.objects.get(id=upload_id)))
+
+        response = self.put(upload_id, 1000, self.data[1000:2000])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '0')
+        self.assertEqual(PassportUpload.objects.get(id=upload_id).offset, 0)
+
+        # Клиент досылает с фактического смещения, файл собирается без нулей
+        self.upload_all(upload_id)
+        self.assertEqual(self.complete(upload_id).status_code, 200)
+
+    def test_file_checksum_mismatch_is_rejected(self):
+        upload_id = self.init(sha256='0' * 64)
+        self.upload_all(upload_id)
+
+        response = self.complete(upload_id)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(PassportUpload.objects.get(id=upload_id).status, PassportUpload.STATUS_PENDING)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['local'].clear()
+        self.client = APIClient()
+
+    def login(self, email='nobody@example.kg', **extra):
+        return self.client.post('/api/v1/users/auth/token/', {'email': email, 'password': 'secret'}, format='json', **extra)
+
+    def test_email_bucket_exhaustion_sets_retry_after(self):
+        # login_email: 5/min — пять попыток подряд, затем одна раз в 12 секунд
+        for _ in range(5):
+            self.assertEqual(self.login().status_code, 401)
+
+        with self.assertLogs('apps.users.throttling', 'WARNING'):
+            response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response['Retry-After']) <= 12)
+
+    def test_spoofed_forwarded_for_shares_proxy_bucket(self):
+        # За nginx (NUM_PROXIES=1) клиентский префикс X-Forwarded-For не даёт новую корзину
+        with mock.patch.object(IPThrottle, 'THROTTLE_RATES', {'login_ip': '2/min'}), \
+                self.assertLogs('apps.users.throttling', 'WARNING'):
+            statuses = [
+                self.login(f'user{i}@example.kg', HTTP_X_FORWARDED_FOR=f'10.0.0.{i}, 203.0.113.7').status_code
+                for i in range(3)
+            ]
+
+        self.assertEqual(statuses, [401, 401, 429])
+
+    def test_unknown_email_still_hashes_password(self):
+        with mock.patch('django.contrib.auth.base_user.make_password', return_value='!') as make_password:
+            response = self.login()
+
+        self.assertEqual(response.status_code, 401)
+        make_password.assert_called_once_with('secret')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CachedReferenceTests(TestCase):
+    databases = {PRIMARY, REPLICA}
+
+    def setUp(self):
+        caches['default'].clear()
+        rendered_cache.clear()
+        self.client = APIClient()
+
+    def get(self, **extra):
+        return self.client.get('/api/v1/users/professions/', **extra)
+
+    def test_host_and_scheme_are_part_of_cache_key(self):
+        first = self.get(HTTP_HOST='jymysh.kg')
+        other_host = self.get(HTTP_HOST='www.jymysh.kg', HTTP_IF_NONE_MATCH=first['ETag'])
+        other_scheme = self.get(HTTP_HOST='jymysh.kg', HTTP_IF_NONE_MATCH=first['ETag'], secure=True)
+        same = self.get(HTTP_HOST='jymysh.kg', HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(other_host.status_code, 200)
+        self.assertEqual(other_scheme.status_code, 200)
+        self.assertEqual(same.status_code, 304)
+
+    @override_settings(CACHES=UNAVAILABLE_CACHES)
+    def test_unavailable_cache_serves_uncached(self):
+        with self.assertLogs('apps.users.reference', 'WARNING'):
+            response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DeletedUserVerificationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='deleted@example.kg', full_name='Deleted')
+        self.job = PassportVerification.objects.create(
+            user=self.user, generation=1, status=PassportVerification.STATUS_RUNNING,
+        )
+
+    def test_task_for_deleted_user_leaves_failed_job(self):
+        user_id = self.user.pk
+        self.user.delete()
+
+        with mock.patch.object(passport_tasks, 'predict_passport_photos') as predict:
+            passport_tasks._validate_passport_images(user_id, 1)
+
+        predict.assert_not_called()
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, PassportVerification.STATUS_FAILED)
+        self.assertIsNotNone(self.job.finished_at)
+
+    def test_verified_user_hashes_are_removed_from_index(self):
+        User.objects.filter(pk=self.user.pk).update(is_verified=True)
+        user = User.objects.get(pk=self.user.pk)
+        index = mock.Mock()
+
+        with mock.patch('core.passport_classifier.utils.get_hash_index', return_value=index), \
+                self.captureOnCommitCallbacks(execute=True):
+            user.delete()
+
+        index.remove.assert_called_once_with(self.user.pk)
+
+    def test_finished_job_is_kept(self):
+        PassportVerification.objects.filter(pk=self.job.pk).update(status=PassportVerification.STATUS_REJECTED)
+        self.user.delete()
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, PassportVerification.STATUS_REJECTED)
+
+
+class UserSearchTests(TestCase):
+    def setUp(self):
+        self.aibek = User.objects.create(email='aibek@example.kg', full_name='Айбек Садыров', phone='+996555123456')
+        self.other = User.objects.create(email='nurlan@mail.kg', full_name='Нурлан Токтогулов', phone='+996700000000')
+
+    def search(self, term):
+        return list(search_users(User.objects.order_by('id'), term))
+
+    def test_full_text_prefix_search(self):
+        self.assertEqual(self.search('айб сад'), [self.aibek])
+        self.assertEqual(self.search('Токтогул'), [self.other])
+        self.assertEqual(self.search('айбек нурлан'), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.aibek.full_name = 'Бакыт Садыров'
+        self.aibek.save()
+        self.other.delete()
+
+        self.assertEqual(self.search('айбек'), [])
+        self.assertEqual(self.search('бакыт'), [self.aibek])
+        self.assertEqual(self.search('нурлан'), [])
+
+    def test_email_and_phone_prefix(self):
+        self.assertEqual(self.search('AIBEK@'), [self.aibek])
+        self.assertEqual(self.search('+996700'), [self.other])
+
+
+# Каталог и счётчики читаются из реплики — данные должны быть закоммичены
+@override_settings(CACHES=LOCMEM_CACHES)
+class ExecutorCatalogTests(TransactionTestCase):
+    databases = {PRIMARY, REPLICA}
+
+    def setUp(self):
+        caches['default'].clear()
+        self.executor = UserRole.objects.create(name='исполнитель', label='Исполнитель')
+        self.customer = UserRole.objects.create(name='заказчик', label='Заказчик')
+        region = UserRegion.objects.create(title='Чуйская область')
+        self.subregion = UserSubRegion.objects.create(title='Бишкек', region=region)
+        self.plumber = Profession.objects.create(title='Сантехник')
+        self.electrician = Profession.objects.create(title='Электрик')
+        self.client = APIClient()
+
+    def create_executor(self, n, **fields):
+        fields = {'role': self.executor, 'profession': self.plumber, 'subregion': self.subregion, **fields}
+        return User.objects.create(email=f'executor{n}@example.kg', full_name=f'Исполнитель {n}', **fields)
+
+    def pages(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.append([item['id'] for item in response.json()['results']])
+            url = response.json()['next']
+        return ids
+
+    def test_cursor_pages_are_stable(self):
+        executors = [self.create_executor(n) for n in range(5)]
+        self.client.force_authenticate(executors[0])
+
+        first = self.client.get('/api/v1/users/executors/?page_size=2').json()
+        # Новый исполнитель появляется в начале списка и не сдвигает следующие страницы
+        self.create_executor(99)
+        rest = self.pages(first['next'])
+
+        walked = [item['id'] for item in first['results']] + [pk for page in rest for pk in page]
+        self.assertEqual(walked, [user.pk for user in reversed(executors)])
+
+    def test_filters(self):
+        plumber = self.create_executor(1)
+        electrician = self.create_executor(2, profession=self.electrician)
+        self.create_executor(3, role=self.customer)
+        mark_verified(electrician.pk)
+        self.client.force_authenticate(plumber)
+
+        self.assertEqual(self.pages(f'/api/v1/users/executors/?profession={self.plumber.pk}'), [[plumber.pk]])
+        self.assertEqual(self.pages('/api/v1/users/executors/?verified=true'), [[electrician.pk]])
+
+    def assert_counts_match(self):
+        stored = {
+            (row.profession_id, row.subregion_id): (row.total, row.verified)
+            for row in ExecutorCount.objects.filter(total__gt=0)
+        }
+        self.assertEqual(stored, actual_counts())
+        self.assertEqual(find_drift(), [])
+
+        response = self.client.get('/api/v1/users/reference/executor-counts/')
+        served = {(row['profession'], row['subregion']): (row['total'], row['verified']) for row in response.json()}
+        self.assertEqual(served, stored)
+
+    def test_counts_follow_user_transitions(self):
+        users = [self.create_executor(n) for n in range(3)]
+        self.assert_counts_match()
+
+        # Смена роли, профессии, подтверждение и удаление
+        users[0].role = self.customer
+        users[0].save()
+        self.assert_counts_match()
+
+        users[1].profession = self.electrician
+        users[1].save(update_fields=['profession'])
+        self.assert_counts_match()
+
+        mark_verified(users[2].pk)
+        self.assert_counts_match()
+
+        users[2].delete()
+        self.assert_counts_match()
+
+    def test_stale_instance_keeps_counts(self):
+        user = self.create_executor(1)
+        # Проверка паспорта подтверждает пользователя через update(), объект в памяти устарел
+        mark_verified(user.pk)
+
+        user.profession = self.electrician
+        user.save(update_fields=['profession'])
+        self.assert_counts_match()
+        self.assertEqual(ExecutorCount.objects.get(profession=self.electrician).verified, 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class VerificationStatusTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.job = PassportVerification.objects.create(generation=1)
+        self.url = f'/api/v1/users/verify-passport/{self.job.id}/'
+
+    def test_pending_job_answers_immediately_with_retry_after(self):
+        with mock.patch('time.sleep', side_effect=AssertionError('sleep in request')):
+            response = APIClient().get(self.url, {'wait': 30})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], PassportVerification.STATUS_QUEUED)
+        self.assertEqual(response['Retry-After'], '3')
+
+        again = APIClient().get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['Retry-After'], '3')
+
+    def test_finished_job_has_no_retry_after(self):
+        PassportVerification.objects.filter(pk=self.job.pk).update(status=PassportVerification.STATUS_VERIFIED)
+
+        response = APIClient().get(self.url)
+        self.assertEqual(response.json()['status'], PassportVerification.STATUS_VERIFIED)
+        self.assertNotIn('Retry-After', response)
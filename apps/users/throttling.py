@@ -0,0 +1,183 @@
+import hashlib
+import logging
+import math
+import threading
+
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.throttling import SimpleRateThrottle
+
+logger = logging.getLogger(__name__)
+
+# Ограничение частоты для входа, регистрации и подтверждения email.
+# Token bucket: ёмкость и скорость пополнения задаются строкой DRF ('5/min'
+# — до 5 попыток подряд, затем одна попытка каждые 12 секунд). Состояние
+# хранится в общем кэше, при его недоступности — в локальной памяти процесса.
+# Чтение и списание токена атомарны: в Redis — Lua-скриптом, иначе — под
+# блокировкой процесса. Параллельные запросы не могут потратить один токен дважды.
+# Троттлинг срабатывает в APIView.initial(), до сериализатора и хэширования пароля.
+
+METRICS_KEY = 'throttle:metrics:{}:{}'
+
+
+def _cache_call(method, *args, **kwargs):
+    try:
+        return getattr(caches['default'], method)(*args, **kwargs)
+    except ValueError:
+        # incr() отсутствующего ключа — не ошибка кэша
+        raise
+    except Exception:
+        return getattr(caches['local'], method)(*args, **kwargs)
+
+
+# KEYS[1] — хэш {tokens, ts}; ARGV: ёмкость, пополнение в секунду, текущее время, TTL
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * refill)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[4]))
+return {allowed, tostring(tokens)}
+"""
+
+_script = None
+_local_lock = threading.Lock()
+
+
+def _take_token_redis(cache, key, capacity, refill_per_second, now, timeout):
+    global _script
+    client = cache._cache.get_client(key, write=True)
+    if _script is None:
+        _script = client.register_script(TOKEN_BUCKET_SCRIPT)
+    allowed, tokens = _script(
+        keys=[cache.make_and_validate_key(key)],
+        args=[capacity, refill_per_second, now, timeout],
+        client=client,
+    )
+    return bool(allowed), float(tokens)
+
+
+def _take_token_locked(cache, key, capacity, refill_per_second, now, timeout):
+    with _local_lock:
+        tokens, updated_at = cache.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + max(0, now - updated_at) * refill_per_second)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        cache.set(key, (tokens, now), timeout=timeout)
+    return allowed, tokens
+
+
+def take_token(key, capacity, refill_per_second, now, timeout):
+    """Пополняет корзину и списывает токен одной операцией. Возвращает (разрешено, остаток)."""
+    args = (key, capacity, refill_per_second, now, timeout)
+    try:
+        cache = caches['default']
+        if isinstance(cache, RedisCache):
+            return _take_token_redis(cache, *args)
+        return _take_token_locked(cache, *args)
+    except Exception:
+        return _take_token_locked(caches['local'], *args)
+
+
+def record_metric(scope, outcome):
+    key = METRICS_KEY.format(scope, outcome)
+    try:
+        _cache_call('incr', key)
+    except ValueError:
+        _cache_call('add', key, 0, timeout=None)
+        _cache_call('incr', key)
+
+
+def get_metrics(scopes):
+    return {
+        scope: {
+            outcome: _cache_call('get', METRICS_KEY.format(scope, outcome)) or 0
+            for outcome in ('processed', 'rejected')
+        }
+        for scope in scopes
+    }
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Базовый класс: scope берётся из view.throttle_scope + scope_suffix,
+    скорость — из REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'].
+    """
+
+    scope_suffix = None
+
+    def __init__(self):
+        # Как в ScopedRateThrottle: scope известен только в allow_request
+        self._wait = None
+
+    def get_ident_value(self, request):
+        raise NotImplementedError
+
+    def get_cache_key(self, request, view):
+        ident = self.get_ident_value(request)
+        if not ident:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        base_scope = getattr(view, 'throttle_scope', None)
+        if not base_scope:
+            return True
+
+        self.scope = f"{base_scope}_{self.scope_suffix}"
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        capacity = self.num_requests
+        refill_per_second = capacity / self.duration
+        now = self.timer()
+
+        allowed, tokens = take_token(self.key, capacity, refill_per_second, now, math.ceil(self.duration))
+        if not allowed:
+            self._wait = (1 - tokens) / refill_per_second
+            record_metric(self.scope, 'rejected')
+            logger.warning("Throttled %s for %s", self.scope, self.key)
+            return False
+
+        record_metric(self.scope, 'processed')
+        return True
+
+    def wait(self):
+        return self._wait
+
+
+class IPThrottle(TokenBucketThrottle):
+    # Адрес клиента — по REST_FRAMEWORK['NUM_PROXIES'], см. settings
+    scope_suffix = 'ip'
+
+    def get_ident_value(self, request):
+        return self.get_ident(request)
+
+
+class EmailThrottle(TokenBucketThrottle):
+    scope_suffix = 'email'
+
+    def get_ident_value(self, request):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not isinstance(email, str):
+            return None
+        email = email.strip().lower()
+        if not email:
+            return None
+        return hashlib.sha1(email.encode()).hexdigest()
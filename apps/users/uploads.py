@@ -0,0 +1,98 @@
+import io
+import os
+
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+
+from core.passport_classifier.phash import phash_image, to_signed
+from core.passport_classifier.preprocessing import ARTIFACT_SUFFIX, IMAGE_SIZE
+
+# Нормализация загружаемых фото паспорта: проверка размера и числа пикселей
+# до декодирования, поворот по EXIF, уменьшение и перекодирование в JPEG.
+# Рядом с изображением сохраняется артефакт для классификатора —
+# массив 224x224x3 uint8 (.npy), чтобы воркер не декодировал фото заново.
+# Перцептивный хэш фото сохраняется в поле <поле>_phash пользователя.
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'WEBP')
+
+PASSPORT_FIELDS = ('passport_front', 'passport_back', 'passport_selfie')
+
+
+def normalize_passport_image(uploaded):
+    """
+    Возвращает ContentFile с канонической JPEG-версией изображения.
+    В атрибуте inference_pixels — массив (224, 224, 3) uint8 для классификатора,
+    в phash — перцептивный хэш.
+    """
+    max_bytes = getattr(settings, 'PASSPORT_UPLOAD_MAX_BYTES', 20 * 1024 * 1024)
+    max_pixels = getattr(settings, 'PASSPORT_UPLOAD_MAX_PIXELS', 50_000_000)
+    max_side = getattr(settings, 'PASSPORT_IMAGE_MAX_SIDE', 1600)
+    quality = getattr(settings, 'PASSPORT_IMAGE_QUALITY', 85)
+
+    if uploaded.size is not None and uploaded.size > max_bytes:
+        raise serializers.ValidationError(f'Файл больше {max_bytes // (1024 * 1024)} МБ')
+
+    uploaded.seek(0)
+    try:
+        # Image.open читает только заголовок — размеры известны до декодирования
+        img = Image.open(uploaded)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise serializers.ValidationError('Файл не является изображением')
+
+    if img.format not in ALLOWED_FORMATS:
+        raise serializers.ValidationError('Допустимые форматы: JPEG, PNG, WEBP')
+
+    width, height = img.size
+    if width * height > max_pixels:
+        raise serializers.ValidationError('Слишком большое разрешение изображения')
+
+    try:
+        img.draft('RGB', (max_side, max_side))
+        img = ImageOps.exif_transpose(img)
+        img = img.convert('RGB')
+        img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS, reducing_gap=3.0)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        raise serializers.ValidationError('Не удалось прочитать изображение')
+
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=quality, optimize=True)
+
+    name = os.path.splitext(os.path.basename(uploaded.name or 'passport'))[0] + '.jpg'
+    content = ContentFile(buffer.getvalue(), name=name)
+    content.inference_pixels = np.asarray(img.resize(IMAGE_SIZE), dtype=np.uint8)
+    content.phash = phash_image(img)
+    return content
+
+
+def save_inference_artifacts(user, files):
+    """
+    Сохраняет .npy-артефакты рядом с сохранёнными изображениями пользователя
+    и перцептивные хэши в его поля <поле>_phash.
+    files — словарь {поле: ContentFile из normalize_passport_image}.
+    """
+    hashes = {
+        f'{field}_phash': to_signed(content.phash)
+        for field, content in files.items()
+        if getattr(content, 'phash', None) is not None
+    }
+    if hashes:
+        for name, value in hashes.items():
+            setattr(user, name, value)
+        type(user).objects.filter(pk=user.pk).update(**hashes)
+
+    for field, content in files.items():
+        pixels = getattr(content, 'inference_pixels', None)
+        field_file = getattr(user, field)
+        if pixels is None or not field_file:
+            continue
+
+        buffer = io.BytesIO()
+        np.save(buffer, pixels)
+        artifact_name = field_file.name + ARTIFACT_SUFFIX
+        storage = field_file.storage
+        if storage.exists(artifact_name):
+            storage.delete(artifact_name)
+        storage.save(artifact_name, ContentFile(buffer.getvalue()))
@@ -11,7 +11,14 @@ from .views import (
     RoleViewSet,
     RegionViewSet,
     SubRegionViewSet,
-    ProfessionViewSet
+    ProfessionViewSet,
+    ReferenceDataView,
+    PassportUploadInitView,
+    PassportUploadView,
+    PassportUploadCompleteView,
+    PassportVerificationStatusView,
+    ExecutorSearchView,
+    ExecutorCountView
 )
 from rest_framework_simplejwt.views import TokenRefreshView
 
@@ -39,6 +46,19 @@ urlpatterns = [
 
     # Проверка паспорта (асинхронная задача)
     path('verify-passport/', PassportVerificationAPIView.as_view(), name='verify-passport'),
+    path('verify-passport/<uuid:verification_id>/', PassportVerificationStatusView.as_view(), name='passport-verification'),
+
+    # Возобновляемая загрузка фото паспорта частями
+    path('uploads/', PassportUploadInitView.as_view(), name='passport-upload-init'),
+    path('uploads/<uuid:upload_id>/', PassportUploadView.as_view(), name='passport-upload'),
+    path('uploads/<uuid:upload_id>/complete/', PassportUploadCompleteView.as_view(), name='passport-upload-complete'),
+
+    # Каталог исполнителей
+    path('executors/', ExecutorSearchView.as_view(), name='executors'),
+
+    # Все справочники одним ответом
+    path('reference/', ReferenceDataView.as_view(), name='reference'),
+    path('reference/executor-counts/', ExecutorCountView.as_view(), name='executor-counts'),
 
     # Остальные ViewSets
     path('', include(router.urls)),
@@ -0,0 +1,111 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.users.models import PassportVerification
+from core.passport_classifier.client import enqueue_passport_validation
+
+# Слияние повторных отправок паспорта одного пользователя (latest wins).
+# Каждая отправка увеличивает поколение пользователя. В очереди держится не
+# больше одной задачи: пока она не начала работу (ключ pending), новые
+# отправки задачу не ставят — стартовав, она возьмёт последнее поколение и
+# текущие файлы из БД. Задача с устаревшим поколением завершается до загрузки
+# изображений, а результат записывается, только если поколение не сменилось.
+#
+# Каждой отправке соответствует запись PassportVerification с тем же поколением:
+# клиент следит за ней через статус-эндпоинт, задача обновляет её одиночными update().
+
+GENERATION_KEY = 'passport:verification:generation:{}'
+PENDING_KEY = 'passport:verification:pending:{}'
+# Поколение, взятое задачей с данным токеном: повторная доставка того же
+# сообщения (acks_late, падение воркера) продолжает проверку этого поколения
+CLAIMED_KEY = 'passport:verification:claimed:{}'
+
+
+def _pending_timeout():
+    # Если сообщение потеряно, ключ истечёт и следующая отправка поставит задачу
+    return getattr(settings, 'PASSPORT_VERIFICATION_PENDING_TIMEOUT', 600)
+
+
+def _claim_timeout():
+    # Дольше visibility timeout брокера: за это время неподтверждённое сообщение доставляется снова
+    return getattr(settings, 'PASSPORT_VERIFICATION_CLAIM_TIMEOUT', 7200)
+
+
+def next_generation(user_id):
+    key = GENERATION_KEY.format(user_id)
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Ключ вытеснен между add и incr
+        cache.add(key, 1, timeout=None)
+        return cache.get(key)
+
+
+def current_generation(user_id):
+    return cache.get(GENERATION_KEY.format(user_id))
+
+
+def start_passport_verification(user):
+    """
+    Регистрирует новую отправку и ставит проверку в очередь, если в очереди
+    ещё нет задачи этого пользователя. Возвращает PassportVerification.
+    """
+    generation = next_generation(user.id)
+    job = PassportVerification.objects.create(user=user, generation=generation)
+
+    # Предыдущие незавершённые проверки заменяются новой отправкой
+    now = timezone.now()
+    PassportVerification.objects.filter(
+        user=user, status__in=[PassportVerification.STATUS_QUEUED, PassportVerification.STATUS_RUNNING],
+    ).exclude(pk=job.pk).update(status=PassportVerification.STATUS_SUPERSEDED, finished_at=now, updated_at=now)
+
+    token = uuid.uuid4().hex
+    if cache.add(PENDING_KEY.format(user.id), token, timeout=_pending_timeout()):
+        enqueue_passport_validation(user.id, generation, token)
+    return job
+
+
+def update_verification(user_id, generation, **fields):
+    """Одиночный UPDATE незавершённой записи проверки для поколения пользователя."""
+    fields['updated_at'] = timezone.now()
+    return PassportVerification.objects.filter(
+        user_id=user_id,
+        generation=generation,
+        status__in=[PassportVerification.STATUS_QUEUED, PassportVerification.STATUS_RUNNING],
+    ).update(**fields)
+
+
+def claim_generation(user_id, generation, token):
+    """
+    Вызывается задачей перед загрузкой изображений. Возвращает поколение,
+    которое задача проверяет, или None, если задача устарела.
+    """
+    pending_key = PENDING_KEY.format(user_id)
+    if token is not None:
+        claimed = cache.get(CLAIMED_KEY.format(token))
+        if claimed is not None:
+            # Повторная доставка: поколение уже взято этой задачей
+            generation = claimed
+        elif cache.get(pending_key) == token:
+            # Задача из очереди: сначала снимает pending, затем берёт последнее
+            # поколение. Отправка до удаления ключа не ставит задачу (add не
+            # проходит), но её поколение прочитано уже после удаления; отправка
+            # после удаления ставит новую задачу сама
+            cache.delete(pending_key)
+            generation = current_generation(user_id) or generation
+            cache.set(CLAIMED_KEY.format(token), generation, timeout=_claim_timeout())
+            return generation
+
+    latest = current_generation(user_id)
+    if latest is not None and latest != generation:
+        return None
+    return generation
+
+
+def is_current_generation(user_id, generation):
+    latest = current_generation(user_id)
+    return latest is None or latest == generation
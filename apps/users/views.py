@@ -1,10 +1,11 @@
 from rest_framework import generics, mixins, viewsets
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from django.core.mail import send_mail
-from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Prefetch
+from rest_framework.exceptions import ValidationError
 from random import randint
-from .models import User, UserRegion, UserSubRegion, Profession, UserRole
+from .models import User, UserRegion, UserSubRegion, Profession, UserRole, PassportUpload, PassportVerification, ExecutorCount
 from .serializers import (
     CustomTokenObtainPairSerializer,
     RegisterSerializer,
@@ -13,18 +14,38 @@ from .serializers import (
     RegionSerializer,
     SubRegionSerializer,
     ProfessionSerializer,
+    ReferenceDataSerializer,
     RoleSerializer,
-    UploadDocumentsSerializer
+    UploadDocumentsSerializer,
+    PassportUploadInitSerializer,
+    PassportUploadSerializer,
+    PassportVerificationSerializer,
+    ExecutorSerializer,
+    ExecutorCountSerializer
 )
-from core.passport_classifier.tasks import validate_passport_images_task
-from apps.users.permissions import IsExecutorPermission
+from apps.users.tasks import send_verification_email_task
+from core.db_router import ReplicaReadMixin
+from apps.users.chunked_upload import ChunkError, append_chunk, claim_verification_batch, complete_upload
+from apps.users.verification import start_passport_verification
+from apps.users.executor_counts import EXECUTOR_ROLE
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from apps.users.authentication import get_db_user
+from apps.users.permissions import IsExecutorPermission, get_role_name
+from apps.users.uploads import save_inference_artifacts
+from apps.users.throttling import EmailThrottle, IPThrottle
+from apps.users.reference import CachedReferenceMixin, EXECUTOR_COUNTS, PROFESSIONS, REGIONS, ROLES, SUBREGIONS, get_role_id
+from apps.users.pagination import ExecutorCursorPagination
 from rest_framework.views import APIView
+from rest_framework.reverse import reverse
 from rest_framework import status
 
 
 # Авторизация через кастомный сериализатор
 class CustomTokenObtainPairView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [IPThrottle, EmailThrottle]
+    throttle_scope = 'login'
 
     def post(self, request):
         serializer = CustomTokenObtainPairSerializer(data=request.data)
@@ -37,6 +58,8 @@ class RegisterView(mixins.CreateModelMixin, generics.GenericAPIView):
     queryset = User.objects.all()
     serializer_class = RegisterSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [IPThrottle]
+    throttle_scope = 'register'
 
     def perform_create(self, serializer):
         user = serializer.save()
@@ -44,12 +67,9 @@ class RegisterView(mixins.CreateModelMixin, generics.GenericAPIView):
         user.email_verification_code = code
         user.save()
 
-        send_mail(
-            subject='Подтверждение Email',
-            message=f'Ваш код подтверждения: {code}',
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            fail_silently=False,
+        # Письмо отправляет воркер из очереди mail, запрос не ждёт SMTP
+        transaction.on_commit(
+            lambda: send_verification_email_task.delay(user.email, code)
         )
         return user
 
@@ -61,6 +81,8 @@ class RegisterView(mixins.CreateModelMixin, generics.GenericAPIView):
 class VerifyEmailView(generics.GenericAPIView):
     serializer_class = VerifyEmailSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [IPThrottle, EmailThrottle]
+    throttle_scope = 'verify_email'
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -83,29 +105,125 @@ class VerifyEmailView(generics.GenericAPIView):
         return Response({"message": "Email подтвержден"})
 
 
-# CRUD и справочники
-class RoleViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = UserRole.objects.all()
+# CRUD и справочники (кэшируются по версиям таблиц, см. reference.py; читаются из реплики)
+class RoleViewSet(ReplicaReadMixin, CachedReferenceMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = UserRole.objects.order_by('id')
     serializer_class = UserRoleSerializer
     permission_classes = [AllowAny]
+    reference_tables = (ROLES,)
 
 
-class RegionViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = UserRegion.objects.all()
+class RegionViewSet(ReplicaReadMixin, CachedReferenceMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = UserRegion.objects.order_by('id')
     serializer_class = RegionSerializer
     permission_classes = [AllowAny]
+    reference_tables = (REGIONS,)
 
 
-class SubRegionViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = UserSubRegion.objects.all()
+class SubRegionViewSet(ReplicaReadMixin, CachedReferenceMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = UserSubRegion.objects.order_by('id')
     serializer_class = SubRegionSerializer
     permission_classes = [AllowAny]
+    reference_tables = (SUBREGIONS,)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if getattr(self, 'swagger_fake_view', False):
+            # Схема генерируется при деплое без запроса
+            return queryset
+        region = self.request.query_params.get('region')
+        if region is not None:
+            if not region.isdigit():
+                raise ValidationError({'region': 'Ожидается id региона'})
+            # Фильтр идёт по индексу внешнего ключа region_id
+            queryset = queryset.filter(region_id=int(region))
+        return queryset
+
+
+class ProfessionViewSet(ReplicaReadMixin, CachedReferenceMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Profession.objects.order_by('id')
+    serializer_class = ProfessionSerializer
+    permission_classes = [AllowAny]
+    reference_tables = (PROFESSIONS,)
 
 
-class ProfessionViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Profession.objects.all()
-    serializer_class = ProfessionSerializer
+# Все справочники одним запросом: регионы с подрегионами, профессии и роли
+class ReferenceDataView(ReplicaReadMixin, CachedReferenceMixin, APIView):
     permission_classes = [AllowAny]
+    reference_tables = (REGIONS, SUBREGIONS, PROFESSIONS, ROLES)
+
+    def get(self, request):
+        return self._cached_response(request, self._build_response)
+
+    def _build_response(self, request):
+        regions = UserRegion.objects.order_by('id').prefetch_related(
+            Prefetch('subregions', queryset=UserSubRegion.objects.order_by('id'))
+        )
+        serializer = ReferenceDataSerializer({
+            'regions': regions,
+            'professions': Profession.objects.order_by('id'),
+            'roles': UserRole.objects.order_by('id'),
+        })
+        return Response(serializer.data)
+
+
+def filter_by_profession_and_location(queryset, params):
+    """Фильтры ?profession=, ?subregion=, ?region= (id) для моделей с полями profession и subregion."""
+    lookups = {'profession': 'profession_id', 'subregion': 'subregion_id', 'region': 'subregion__region_id'}
+    for name, lookup in lookups.items():
+        value = params.get(name)
+        if value is None:
+            continue
+        if not value.isdigit():
+            raise ValidationError({name: 'Ожидается id'})
+        queryset = queryset.filter(**{lookup: int(value)})
+    return queryset
+
+
+# Каталог исполнителей с фильтрами по профессии, подрегиону, региону и верификации
+class ExecutorSearchView(ReplicaReadMixin, generics.ListAPIView):
+    serializer_class = ExecutorSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = ExecutorCursorPagination
+
+    def get_queryset(self):
+        queryset = User.objects.select_related('profession', 'subregion').only(
+            'id', 'full_name', 'is_verified', 'date_joined',
+            'profession__id', 'profession__title',
+            'subregion__id', 'subregion__title', 'subregion__region_id',
+        )
+        if getattr(self, 'swagger_fake_view', False):
+            return queryset.none()
+
+        role_id = get_role_id(EXECUTOR_ROLE)
+        if role_id is None:
+            return queryset.none()
+        # Все фильтры — равенства по ведущим колонкам индекса users_executor_search_idx
+        queryset = queryset.filter(role_id=role_id)
+        queryset = filter_by_profession_and_location(queryset, self.request.query_params)
+
+        verified = self.request.query_params.get('verified')
+        if verified is not None:
+            # __in вместо точного сравнения: is_verified=True в SQLite превращается в
+            # WHERE "is_verified" без «=», и индекс по этой колонке не используется
+            queryset = queryset.filter(is_verified__in=[verified.lower() in ('1', 'true')])
+        return queryset
+
+
+# Число исполнителей по профессиям и подрегионам: чтение готовых счётчиков без подсчёта по пользователям
+class ExecutorCountView(ReplicaReadMixin, CachedReferenceMixin, generics.ListAPIView):
+    serializer_class = ExecutorCountSerializer
+    permission_classes = [AllowAny]
+    pagination_class = None
+    reference_tables = (EXECUTOR_COUNTS,)
+
+    def get_queryset(self):
+        queryset = ExecutorCount.objects.filter(total__gt=0).annotate(
+            region=F('subregion__region_id'),
+        ).order_by('profession_id', 'subregion_id')
+        if getattr(self, 'swagger_fake_view', False):
+            return queryset
+        return filter_by_profession_and_location(queryset, self.request.query_params)
 
 
 # Обновление роли пользователя
@@ -116,8 +234,14 @@ class SetRoleView(generics.UpdateAPIView):
     def update(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        request.user.role = serializer.validated_data['role']
-        request.user.save()
+        try:
+            role = UserRole.objects.get(name=serializer.validated_data['role'])
+        except UserRole.DoesNotExist:
+            return Response({"error": "Роль не найдена"}, status=404)
+        # Смена роли инвалидирует claims ранее выданных токенов (signals.py)
+        user = get_db_user(request)
+        user.role = role
+        user.save()
         return Response({"message": "Роль обновлена"})
 
 
@@ -130,8 +254,9 @@ class SetProfessionView(generics.UpdateAPIView):
         profession_id = request.data.get("profession_id")
         try:
             profession = Profession.objects.get(id=profession_id)
-            request.user.profession = profession
-            request.user.save()
+            user = get_db_user(request)
+            user.profession = profession
+            user.save()
             return Response({"message": "Профессия обновлена"})
         except Profession.DoesNotExist:
             return Response({"error": "Профессия не найдена"}, status=404)
@@ -143,7 +268,7 @@ class UploadDocumentsView(generics.UpdateAPIView):
     permission_classes = [IsAuthenticated]
 
     def update(self, request, *args, **kwargs):
-        serializer = self.get_serializer(instance=request.user, data=request.data, partial=True)
+        serializer = self.get_serializer(instance=get_db_user(request), data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
         return Response({"message": "Документы загружены"})
@@ -157,20 +282,129 @@ class PassportVerificationAPIView(APIView):
         serializer = UploadDocumentsSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        user = request.user
+        user = get_db_user(request)
         user.passport_front = serializer.validated_data['passport_front']
         user.passport_back = serializer.validated_data['passport_back']
         user.passport_selfie = serializer.validated_data['passport_selfie']
         user.save()
+        save_inference_artifacts(user, serializer.validated_data)
 
-        validate_passport_images_task.delay(
-            user.id,
-            user.passport_selfie.path,
-            user.passport_front.path,
-            user.passport_back.path
-        )
+        job = start_passport_verification(user)
 
         return Response(
-            {"detail": "Проверка запущена. Результат появится после обработки."},
+            {
+                "detail": "Проверка запущена. Результат появится после обработки.",
+                "verification_id": str(job.id),
+                "status_url": reverse('passport-verification', args=[job.id], request=request),
+            },
             status=status.HTTP_202_ACCEPTED
         )
+
+
+# Статус проверки паспорта: ответ сразу, без ожидания в синхронном воркере gunicorn.
+# Пока проверка не завершена, ответ содержит Retry-After — через сколько спросить
+# снова; If-None-Match с ETag текущего статуса даёт 304 без тела.
+# Пользователь при отклонении удаляется, поэтому доступ — по UUID проверки
+# (известен только отправителю), без аутентификации; частота опроса ограничена по IP.
+class PassportVerificationStatusView(APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    throttle_classes = [IPThrottle]
+    throttle_scope = 'verification_status'
+
+    def get(self, request, verification_id):
+        job = PassportVerification.objects.filter(id=verification_id).first()
+        if job is None:
+            return Response({"error": "Проверка не найдена"}, status=404)
+
+        etag = f'"{job.status}:{job.updated_at.timestamp()}"'
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if job.status not in PassportVerification.FINAL_STATUSES:
+            headers['Retry-After'] = str(getattr(settings, 'PASSPORT_VERIFICATION_RETRY_AFTER', 3))
+
+        if request.headers.get('If-None-Match') == etag:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(PassportVerificationSerializer(job).data, headers=headers)
+
+
+# Возобновляемая загрузка фото паспорта частями (см. chunked_upload.py)
+class PassportUploadInitView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = PassportUploadInitSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.save(user_id=request.user.pk)
+        data = PassportUploadSerializer(upload).data
+        data['chunk_size'] = getattr(settings, 'PASSPORT_UPLOAD_CHUNK_SIZE', 512 * 1024)
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+class PassportUploadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, upload_id):
+        upload = get_object_or_404(PassportUpload, id=upload_id, user_id=request.user.pk)
+        return Response(PassportUploadSerializer(upload).data, headers={'Upload-Offset': str(upload.offset)})
+
+    def put(self, request, upload_id):
+        max_chunk = getattr(settings, 'PASSPORT_UPLOAD_MAX_CHUNK_SIZE', 2 * 1024 * 1024)
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+        except ValueError:
+            return Response({"error": "Нужен заголовок Upload-Offset"}, status=400)
+
+        stream = request.stream
+        data = stream.read(max_chunk + 1) if stream is not None else b''
+        if len(data) > max_chunk:
+            return Response({"error": f"Часть больше {max_chunk} байт"}, status=413)
+
+        with transaction.atomic():
+            upload = get_object_or_404(
+                PassportUpload.objects.select_for_update(), id=upload_id, user_id=request.user.pk
+            )
+            try:
+                new_offset = append_chunk(upload, offset, data, request.headers.get('Upload-Checksum'))
+            except ChunkError as e:
+                return Response(
+                    {"error": str(e), "offset": upload.offset},
+                    status=e.status_code,
+                    headers={'Upload-Offset': str(upload.offset)},
+                )
+
+        return Response({"offset": new_offset}, headers={'Upload-Offset': str(new_offset)})
+
+
+class PassportUploadCompleteView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, upload_id):
+        # Транзакцию и блокировку строки complete_upload берёт сам, только на смену статуса
+        upload = get_object_or_404(
+            PassportUpload.objects.select_related('user'),
+            id=upload_id,
+            user_id=request.user.pk,
+        )
+        try:
+            user = complete_upload(upload)
+        except ChunkError as e:
+            return Response({"error": str(e), "offset": upload.offset}, status=e.status_code)
+
+        job = None
+        if upload.verification_started:
+            # Повтор complete после запуска проверки — тот же ответ, что и в первый раз
+            job = PassportVerification.objects.filter(user=user).order_by('-created_at').first()
+        elif get_role_name(user) == 'исполнитель' and claim_verification_batch(user):
+            # Проверка запускается, когда загружены все три стороны (claim — один UPDATE)
+            job = start_passport_verification(user)
+
+        if job is not None:
+            return Response(
+                {
+                    "detail": "Файл загружен. Проверка запущена.",
+                    "verification_id": str(job.id),
+                    "status_url": reverse('passport-verification', args=[job.id], request=request),
+                },
+                status=status.HTTP_202_ACCEPTED
+            )
+        return Response({"detail": "Файл загружен"})
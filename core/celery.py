@@ -4,7 +4,7 @@ from celery import Celery
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-app = Celery('core')
+# Модули из include импортируются только воркером, веб-процессы их не загружают
+app = Celery('core', include=['core.passport_classifier.tasks'])
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
-import core.passport_classifier.tasks
\ No newline at end of file
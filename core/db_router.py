@@ -0,0 +1,75 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Маршрутизация запросов к БД: все записи идут в default (primary),
+# чтение внутри read_from_replica() — в реплику, если она настроена.
+# Вне этого контекста чтение тоже идёт в primary, чтобы не ловить
+# отставание реплики сразу после записи.
+
+PRIMARY = 'default'
+REPLICA = 'replica'
+
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+@contextmanager
+def read_from_replica():
+    token = _read_alias.set(REPLICA if replica_configured() else None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика содержит те же данные, что и primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплика получает схему репликацией
+        return db != REPLICA
+
+
+class ReplicaReadMixin:
+    """Для APIView: безопасные методы читают из реплики."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            with read_from_replica():
+                return super().dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+
+class ReplicaReadAdminMixin:
+    """
+    Для ModelAdmin: списки и страницы объектов при GET читают из реплики.
+    Ответ рендерится внутри контекста — queryset'ы админки ленивые.
+    """
+
+    def _read_from_replica(self, view, request, *args):
+        if request.method != 'GET':
+            return view(request, *args)
+        with read_from_replica():
+            response = view(request, *args)
+            if callable(getattr(response, 'render', None)):
+                response.render()
+            return response
+
+    def changelist_view(self, request, extra_context=None):
+        return self._read_from_replica(super().changelist_view, request, extra_context)
+
+    def change_view(self, request, object_id, form_url='', extra_context=None):
+        return self._read_from_replica(super().change_view, request, object_id, form_url, extra_context)
@@ -0,0 +1,146 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_safe
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.generators import OpenAPISchemaGenerator
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+
+# OpenAPI-схема генерируется один раз при деплое (manage.py export_openapi_schema)
+# в версионированные файлы openapi-<хэш>.json/.yaml и манифест. Веб-процесс
+# читает их один раз, держит в памяти вместе с gzip-вариантом и отдаёт с ETag.
+# Генерация схемы на лету (обход всех view и сериализаторов) — только
+# запасной вариант при OPENAPI_SCHEMA_LIVE (по умолчанию DEBUG).
+
+API_VERSION = 'v1'
+
+api_info = openapi.Info(
+    title="Jumush.kg",
+    default_version=API_VERSION,
+    description="Jumush.kg description",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="nurlanuuulubeksultan@gmail.com"),
+    license=openapi.License(name="BSD License"),
+)
+
+schema_view = get_schema_view(
+    api_info,
+    public=True,
+    permission_classes=(permissions.AllowAny,),
+)
+
+MANIFEST_NAME = 'openapi.manifest.json'
+
+FORMATS = {
+    '.json': ('json', 'application/json'),
+    '.yaml': ('yaml', 'application/yaml'),
+}
+
+_artifacts = None
+_artifacts_lock = threading.Lock()
+
+
+def schema_dir():
+    return os.fspath(getattr(settings, 'OPENAPI_SCHEMA_DIR', settings.BASE_DIR / 'openapi'))
+
+
+def generate_schema_artifacts(output_dir=None):
+    """Генерирует схему и записывает файлы и манифест. Возвращает манифест."""
+    output_dir = output_dir or schema_dir()
+    os.makedirs(output_dir, exist_ok=True)
+
+    schema = OpenAPISchemaGenerator(api_info, version=API_VERSION).get_schema(request=None, public=True)
+    body_json = OpenAPICodecJson(validators=[]).encode(schema)
+    body_yaml = OpenAPICodecYaml(validators=[]).encode(schema)
+    version = hashlib.sha256(body_json).hexdigest()[:16]
+
+    manifest = {
+        'version': version,
+        'api_version': API_VERSION,
+        'generated_at': timezone.now().isoformat(),
+        'json': f'openapi-{version}.json',
+        'yaml': f'openapi-{version}.yaml',
+    }
+    for key, body in (('json', body_json), ('yaml', body_yaml)):
+        with open(os.path.join(output_dir, manifest[key]), 'wb') as f:
+            f.write(body)
+
+    # Манифест подменяется атомарно: процессы видят либо старую, либо новую версию целиком
+    tmp = os.path.join(output_dir, MANIFEST_NAME + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(output_dir, MANIFEST_NAME))
+
+    current = {manifest['json'], manifest['yaml'], MANIFEST_NAME}
+    for name in os.listdir(output_dir):
+        if name.startswith('openapi-') and name not in current:
+            os.remove(os.path.join(output_dir, name))
+    return manifest
+
+
+def load_artifacts():
+    """{'.json': (body, gzip_body, etag), '.yaml': ...} или None, если схема не сгенерирована."""
+    global _artifacts
+    if _artifacts is None:
+        with _artifacts_lock:
+            if _artifacts is None:
+                _artifacts = _read_artifacts()
+    return _artifacts or None
+
+
+def _read_artifacts():
+    directory = schema_dir()
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        artifacts = {}
+        for suffix, (key, _) in FORMATS.items():
+            with open(os.path.join(directory, manifest[key]), 'rb') as f:
+                body = f.read()
+            artifacts[suffix] = (body, gzip.compress(body, compresslevel=9, mtime=0), f'"{manifest["version"]}-{key}"')
+        return artifacts
+    except (OSError, ValueError, KeyError):
+        # Пустой словарь запоминает отсутствие схемы до перезапуска процесса
+        return {}
+
+
+_live_view = schema_view.without_ui(cache_timeout=0)
+
+
+@require_safe
+def schema_file_view(request, format):
+    if format not in FORMATS:
+        raise Http404
+
+    artifacts = load_artifacts()
+    if artifacts is None:
+        if getattr(settings, 'OPENAPI_SCHEMA_LIVE', settings.DEBUG):
+            return _live_view(request, format=format)
+        return HttpResponse(
+            'OpenAPI-схема не сгенерирована: manage.py export_openapi_schema',
+            status=503, content_type='text/plain; charset=utf-8',
+        )
+
+    body, gzip_body, etag = artifacts[format]
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        accepts_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+        response = HttpResponse(gzip_body if accepts_gzip else body, content_type=FORMATS[format][1])
+        if accepts_gzip:
+            response['Content-Encoding'] = 'gzip'
+        response['Content-Length'] = len(response.content)
+
+    response['ETag'] = etag
+    response['Cache-Control'] = f"public, max-age={getattr(settings, 'OPENAPI_SCHEMA_MAX_AGE', 300)}"
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
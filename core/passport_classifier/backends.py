@@ -0,0 +1,115 @@
+import threading
+import numpy as np
+
+# Бэкенды инференса классификатора паспортов.
+# Каждый бэкенд принимает батч (N, 224, 224, 3) float32 в диапазоне [0, 1]
+# и возвращает вероятности классов (N, 3). Выбор — settings.PASSPORT_CLASSIFIER_BACKEND.
+
+
+class KerasBackend:
+    """Полная Keras-модель (.keras), как при обучении."""
+
+    name = 'keras'
+
+    def __init__(self, model_path):
+        import tensorflow as tf
+
+        self.model = tf.keras.models.load_model(model_path)
+
+    def predict(self, batch):
+        return np.asarray(self.model.predict_on_batch(batch))
+
+
+class CompiledKerasBackend(KerasBackend):
+    """
+    Keras-модель, обёрнутая в tf.function с фиксированной сигнатурой входа:
+    граф трассируется один раз и не пересобирается при смене размера батча.
+    """
+
+    name = 'compiled'
+
+    def __init__(self, model_path, input_shape=(224, 224, 3)):
+        import tensorflow as tf
+
+        super().__init__(model_path)
+        model = self.model
+
+        @tf.function(input_signature=[tf.TensorSpec((None, *input_shape), tf.float32)])
+        def serve(x):
+            return model(x, training=False)
+
+        self._serve = serve
+
+    def predict(self, batch):
+        return self._serve(batch).numpy()
+
+
+class TFLiteBackend:
+    """
+    Экспортированная квантованная модель (.tflite, см. export_passport_model.py).
+    Если установлен лёгкий tflite_runtime, TensorFlow не импортируется вовсе.
+    """
+
+    name = 'tflite'
+
+    def __init__(self, model_path, num_threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+
+            Interpreter = tf.lite.Interpreter
+
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+        # Интерпретатор не потокобезопасен
+        self._lock = threading.Lock()
+
+    def _quantize_input(self, batch):
+        dtype = self._input['dtype']
+        if dtype == np.float32:
+            return batch
+        scale, zero_point = self._input['quantization']
+        return np.round(batch / scale + zero_point).astype(dtype)
+
+    def _dequantize_output(self, output):
+        if self._output['dtype'] == np.float32:
+            return output
+        scale, zero_point = self._output['quantization']
+        return (output.astype(np.float32) - zero_point) * scale
+
+    def predict(self, batch):
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        with self._lock:
+            if batch.shape[0] != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input['index'], batch.shape)
+                self.interpreter.allocate_tensors()
+                self._input = self.interpreter.get_input_details()[0]
+                self._output = self.interpreter.get_output_details()[0]
+                self._batch_size = batch.shape[0]
+
+            self.interpreter.set_tensor(self._input['index'], self._quantize_input(batch))
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self._output['index'])
+
+        return self._dequantize_output(output)
+
+
+BACKENDS = {
+    KerasBackend.name: KerasBackend,
+    CompiledKerasBackend.name: CompiledKerasBackend,
+    TFLiteBackend.name: TFLiteBackend,
+}
+
+
+def create_backend(name, model_path, **options):
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Неизвестный бэкенд классификатора: {name!r}. Доступные: {', '.join(BACKENDS)}"
+        )
+    return backend_class(model_path, **options)
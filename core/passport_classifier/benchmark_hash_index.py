@@ -0,0 +1,82 @@
+"""
+Бенчмарк индекса перцептивных хэшей: запрос «хэши на расстоянии ≤ k» через
+hash_index.HashIndex против полного перебора numpy (XOR + popcount).
+
+    python -m core.passport_classifier.benchmark_hash_index [--size 1000000] [--distance 6]
+
+Хэши синтетические (равномерно случайные 64 бита). Запросы — хэши из индекса
+с несколькими изменёнными битами, так что у каждого есть совпадение.
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from core.passport_classifier.hash_index import RECORD_DTYPE, HashIndex
+
+
+def synthetic_records(size, seed=0):
+    rng = np.random.default_rng(seed)
+    records = np.empty(size, dtype=RECORD_DTYPE)
+    records['hash'] = rng.integers(0, 2 ** 64, size, dtype=np.uint64)
+    records['owner'] = np.arange(size)
+    records['slot'] = rng.integers(0, 3, size)
+    return records
+
+
+def flip_bits(values, bits, rng):
+    flipped = values.copy()
+    for _ in range(bits):
+        flipped ^= np.uint64(1) << rng.integers(0, 64, len(values), dtype=np.uint64)
+    return flipped
+
+
+def timed(func, queries):
+    start = time.perf_counter()
+    for q in queries:
+        func(q)
+    return 1000 * (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=1_000_000)
+    parser.add_argument('--distance', type=int, default=6)
+    parser.add_argument('--queries', type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    records = synthetic_records(args.size)
+    queries = flip_bits(records['hash'][rng.integers(0, args.size, args.queries)], args.distance // 2, rng)
+    hashes = records['hash']
+
+    with tempfile.TemporaryDirectory() as path:
+        index = HashIndex(path, max_distance=args.distance)
+        start = time.perf_counter()
+        index.rebuild(records)
+        print(f"Записей: {args.size}, k = {args.distance}, построение и запись: {time.perf_counter() - start:.2f} с")
+
+        start = time.perf_counter()
+        index = HashIndex(path, max_distance=args.distance)
+        print(f"Загрузка с диска: {time.perf_counter() - start:.2f} с")
+
+        # Результаты индекса и перебора должны совпадать
+        for q in queries[:20]:
+            expected = set(np.flatnonzero(np.bitwise_count(hashes ^ q) <= args.distance))
+            assert {owner for owner, _, _ in index.search(int(q))} == expected
+
+        brute = timed(lambda q: np.flatnonzero(np.bitwise_count(hashes ^ q) <= args.distance), queries[:50])
+        indexed = timed(lambda q: index.search(int(q)), queries)
+
+        for i in range(100):
+            index.add(int(rng.integers(0, 2 ** 64, dtype=np.uint64)), args.size + i)
+        with_delta = timed(lambda q: index.search(int(q)), queries)
+
+    print(f"{'перебор':<24} {brute:8.3f} мс/запрос")
+    print(f"{'индекс':<24} {indexed:8.3f} мс/запрос  x{brute / indexed:.0f}")
+    print(f"{'индекс + 100 в журнале':<24} {with_delta:8.3f} мс/запрос")
+
+
+if __name__ == '__main__':
+    main()
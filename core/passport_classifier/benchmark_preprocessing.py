@@ -0,0 +1,86 @@
+"""
+Бенчмарк декодирования изображений паспорта: исходный путь (полное
+декодирование, float64) против preprocessing.preprocess_batch.
+
+    python -m core.passport_classifier.benchmark_preprocessing [photo.jpg ...]
+
+Без аргументов генерирует синтетические 12 Мп JPEG (4000x3000).
+"""
+import argparse
+import io
+import time
+
+import numpy as np
+from PIL import Image
+
+from core.passport_classifier.preprocessing import IMAGE_SIZE, preprocess_batch
+
+
+def legacy_preprocess(image_file):
+    img = Image.open(image_file)
+    img = img.convert('RGB')
+    img = img.resize(IMAGE_SIZE)
+    img_array = np.array(img) / 255.0
+    return img_array.reshape((1, 224, 224, 3))
+
+
+def synthetic_jpegs(count, size=(4000, 3000)):
+    rng = np.random.default_rng(0)
+    images = []
+    for _ in range(count):
+        # Плавный градиент с шумом сжимается примерно как реальное фото
+        base = np.linspace(0, 255, size[0], dtype=np.float32)[None, :, None]
+        noise = rng.normal(0, 20, (size[1], size[0], 3)).astype(np.float32)
+        pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+        buf = io.BytesIO()
+        Image.fromarray(pixels).save(buf, format='JPEG', quality=90)
+        images.append(buf.getvalue())
+    return images
+
+
+def timed(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('images', nargs='*')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    if args.images:
+        images = [open(path, 'rb').read() for path in args.images]
+    else:
+        images = synthetic_jpegs(3)
+
+    n = len(images)
+
+    def run_legacy():
+        np.concatenate([legacy_preprocess(io.BytesIO(data)) for data in images])
+
+    def run_fast(threads):
+        return lambda: preprocess_batch([io.BytesIO(data) for data in images], max_workers=threads)
+
+    rows = [
+        ('legacy', run_legacy),
+        ('draft, 1 поток', run_fast(1)),
+        (f'draft, {args.threads} потока', run_fast(args.threads)),
+    ]
+
+    print(f"Изображений в батче: {n}, повторов: {args.repeat}")
+    baseline = None
+    for name, func in rows:
+        best, median = timed(func, args.repeat)
+        per_image = 1000 * median / n
+        baseline = baseline or per_image
+        print(f"{name:<20} {per_image:8.1f} мс/изобр. (min {1000 * best / n:.1f})  x{baseline / per_image:.1f}")
+
+
+if __name__ == '__main__':
+    main()
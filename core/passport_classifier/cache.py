@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Кэш предсказаний классификатора по содержимому изображения.
+# Ключ — sha256 байтов изображения, записи привязаны к версии модели:
+# после выкладки новой модели записи старой версии удаляются при первом обращении.
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class MemoryPredictionStore:
+    """LRU в памяти процесса."""
+
+    def __init__(self, max_entries=10000, **options):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model_version, key):
+        with self._lock:
+            entry = self._entries.get((model_version, key))
+            if entry is not None:
+                self._entries.move_to_end((model_version, key))
+            return entry
+
+    def set(self, model_version, key, entry):
+        with self._lock:
+            self._entries[(model_version, key)] = entry
+            self._entries.move_to_end((model_version, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def purge_other_versions(self, model_version):
+        with self._lock:
+            for stale in [k for k in self._entries if k[0] != model_version]:
+                del self._entries[stale]
+
+
+class FilePredictionStore:
+    """
+    JSON-файлы в каталоге <location>/<model_version>/. Давность использования
+    определяется по mtime, который обновляется при каждом попадании.
+    """
+
+    def __init__(self, location, max_entries=10000, **options):
+        self.location = str(location)
+        self.max_entries = max_entries
+        self._writes = 0
+
+    def _path(self, model_version, key):
+        return os.path.join(self.location, model_version, f"{key}.json")
+
+    def get(self, model_version, key):
+        path = self._path(model_version, key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def set(self, model_version, key, entry):
+        path = self._path(model_version, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+        # Вытеснение проверяется не на каждой записи, чтобы не листать каталог постоянно
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._evict(model_version)
+
+    def _evict(self, model_version):
+        directory = os.path.join(self.location, model_version)
+        with os.scandir(directory) as it:
+            files = [(e.stat().st_mtime, e.path) for e in it if e.name.endswith('.json')]
+        if len(files) <= self.max_entries:
+            return
+        files.sort()
+        for _, path in files[:len(files) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def purge_other_versions(self, model_version):
+        import shutil
+
+        if not os.path.isdir(self.location):
+            return
+        for name in os.listdir(self.location):
+            if name != model_version:
+                shutil.rmtree(os.path.join(self.location, name), ignore_errors=True)
+
+
+class DatabasePredictionStore:
+    """Таблица PassportPrediction — общий кэш для всех воркеров."""
+
+    def __init__(self, max_entries=100000, **options):
+        self.max_entries = max_entries
+        self._writes = 0
+
+    def get(self, model_version, key):
+        from django.utils import timezone
+        from apps.users.models import PassportPrediction
+
+        entry = (
+            PassportPrediction.objects
+            .filter(model_version=model_version, content_hash=key)
+            .values('label', 'probabilities')
+            .first()
+        )
+        if entry is not None:
+            PassportPrediction.objects.filter(
+                model_version=model_version, content_hash=key
+            ).update(last_used_at=timezone.now())
+        return entry
+
+    def set(self, model_version, key, entry):
+        from django.utils import timezone
+        from apps.users.models import PassportPrediction
+
+        PassportPrediction.objects.update_or_create(
+            model_version=model_version,
+            content_hash=key,
+            defaults={
+                'label': entry['label'],
+                'probabilities': entry['probabilities'],
+                'last_used_at': timezone.now(),
+            },
+        )
+
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._evict()
+
+    def _evict(self):
+        from apps.users.models import PassportPrediction
+
+        cutoff = list(
+            PassportPrediction.objects
+            .order_by('-last_used_at')
+            .values_list('last_used_at', flat=True)[self.max_entries:self.max_entries + 1]
+        )
+        if cutoff:
+            PassportPrediction.objects.filter(last_used_at__lte=cutoff[0]).delete()
+
+    def purge_other_versions(self, model_version):
+        from apps.users.models import PassportPrediction
+
+        PassportPrediction.objects.exclude(model_version=model_version).delete()
+
+
+STORES = {
+    'memory': MemoryPredictionStore,
+    'file': FilePredictionStore,
+    'db': DatabasePredictionStore,
+}
+
+
+class PredictionCache:
+    def __init__(self, store, model_version):
+        self.store = store
+        self.model_version = model_version
+        self._purged = False
+
+    def _ensure_purged(self):
+        if not self._purged:
+            self.store.purge_other_versions(self.model_version)
+            self._purged = True
+
+    def get(self, key):
+        self._ensure_purged()
+        return self.store.get(self.model_version, key)
+
+    def set(self, key, label, probabilities):
+        self._ensure_purged()
+        self.store.set(self.model_version, key, {'label': label, 'probabilities': probabilities})
+
+
+def create_prediction_cache(config, model_version):
+    """config — словарь settings.PASSPORT_PREDICTION_CACHE или None (кэш выключен)."""
+    if not config:
+        return None
+
+    options = {k.lower(): v for k, v in config.items() if k != 'BACKEND'}
+    backend = config.get('BACKEND', 'memory')
+    try:
+        store_class = STORES[backend]
+    except KeyError:
+        raise ValueError(f"Неизвестное хранилище кэша предсказаний: {backend!r}")
+    return PredictionCache(store_class(**options), model_version)
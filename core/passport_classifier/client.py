@@ -0,0 +1,26 @@
+import time
+
+from core.celery import app
+
+# Задача ставится в очередь по имени: веб-процессу не нужно импортировать
+# tasks.py (и вместе с ним модель).
+VALIDATE_PASSPORT_IMAGES_TASK = 'core.passport_classifier.tasks.validate_passport_images_task'
+
+# Очередь проверок паспорта (settings.CELERY_TASK_ROUTES); модель загружают только её воркеры
+ML_QUEUE = 'ml'
+
+
+# Приоритеты в очереди ml (0 — наивысший)
+PRIORITY_NEW = 5
+PRIORITY_RETRY = 0
+
+
+def enqueue_passport_validation(user_id, generation=None, token=None):
+    # Пути к изображениям задача берёт из БД: к началу работы файлы могли смениться.
+    # Время отправки передаётся, чтобы задача могла проверить SLA ожидания.
+    return app.send_task(
+        VALIDATE_PASSPORT_IMAGES_TASK,
+        args=[user_id],
+        kwargs={'generation': generation, 'token': token, 'submitted_at': time.time()},
+        priority=PRIORITY_NEW,
+    )
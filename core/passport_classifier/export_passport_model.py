@@ -0,0 +1,143 @@
+"""
+Экспорт обученной passport_model.keras в квантованную TFLite-модель для
+CPU-воркеров и отчёт о совпадении предсказаний с Keras-моделью на
+валидационной выборке.
+
+    python core/passport_classifier/export_passport_model.py --quantization float16
+    python core/passport_classifier/export_passport_model.py --quantization int8
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.preprocessing.image import ImageDataGenerator
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+dataset_dir = os.path.join(BASE_DIR, "dataset")
+
+img_height, img_width = 224, 224
+batch_size = 16
+
+
+def validation_generator():
+    # Тот же validation_split, что и в train_passport_model.py, но без аугментаций
+    datagen = ImageDataGenerator(rescale=1./255, validation_split=0.2)
+    return datagen.flow_from_directory(
+        dataset_dir,
+        target_size=(img_height, img_width),
+        batch_size=batch_size,
+        class_mode='categorical',
+        shuffle=False,
+        subset='validation'
+    )
+
+
+def representative_dataset(limit=100):
+    datagen = ImageDataGenerator(rescale=1./255)
+    gen = datagen.flow_from_directory(
+        dataset_dir,
+        target_size=(img_height, img_width),
+        batch_size=1,
+        class_mode=None,
+        shuffle=True
+    )
+    for _ in range(min(limit, gen.samples)):
+        yield [next(gen).astype(np.float32)]
+
+
+def convert(model, quantization):
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantization == 'float16':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == 'int8':
+        # Веса и активации в int8, вход и выход остаются float32
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+    elif quantization != 'none':
+        raise ValueError(f"Неизвестный режим квантования: {quantization}")
+    return converter.convert()
+
+
+def tflite_predict(interpreter, batch):
+    input_details = interpreter.get_input_details()[0]
+    output_details = interpreter.get_output_details()[0]
+    interpreter.resize_tensor_input(input_details['index'], batch.shape)
+    interpreter.allocate_tensors()
+    interpreter.set_tensor(input_details['index'], batch.astype(np.float32))
+    interpreter.invoke()
+    return interpreter.get_tensor(output_details['index'])
+
+
+def parity_report(model, tflite_path):
+    interpreter = tf.lite.Interpreter(model_path=tflite_path)
+    val_gen = validation_generator()
+
+    labels, keras_probs, tflite_probs = [], [], []
+    keras_time = tflite_time = 0.0
+    for _ in range(len(val_gen)):
+        batch, batch_labels = next(val_gen)
+
+        start = time.perf_counter()
+        keras_probs.append(np.asarray(model.predict_on_batch(batch)))
+        keras_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        tflite_probs.append(tflite_predict(interpreter, batch))
+        tflite_time += time.perf_counter() - start
+
+        labels.append(np.argmax(batch_labels, axis=1))
+
+    if not labels:
+        return {'samples': 0}
+
+    labels = np.concatenate(labels)
+    keras_probs = np.concatenate(keras_probs)
+    tflite_probs = np.concatenate(tflite_probs)
+    keras_pred = np.argmax(keras_probs, axis=1)
+    tflite_pred = np.argmax(tflite_probs, axis=1)
+
+    return {
+        'samples': int(len(labels)),
+        'class_indices': val_gen.class_indices,
+        'keras_accuracy': float(np.mean(keras_pred == labels)),
+        'tflite_accuracy': float(np.mean(tflite_pred == labels)),
+        'top1_agreement': float(np.mean(keras_pred == tflite_pred)),
+        'max_abs_prob_diff': float(np.max(np.abs(keras_probs - tflite_probs))),
+        'keras_ms_per_image': 1000 * keras_time / len(labels),
+        'tflite_ms_per_image': 1000 * tflite_time / len(labels),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=os.path.join(BASE_DIR, "passport_model.keras"))
+    parser.add_argument('--output', default=os.path.join(BASE_DIR, "passport_model.tflite"))
+    parser.add_argument('--quantization', choices=['none', 'float16', 'int8'], default='float16')
+    args = parser.parse_args()
+
+    model = tf.keras.models.load_model(args.model)
+    tflite_model = convert(model, args.quantization)
+    with open(args.output, 'wb') as f:
+        f.write(tflite_model)
+
+    report = parity_report(model, args.output)
+    report.update({
+        'quantization': args.quantization,
+        'keras_size_bytes': os.path.getsize(args.model),
+        'tflite_size_bytes': len(tflite_model),
+    })
+
+    report_path = os.path.splitext(args.output)[0] + ".report.json"
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(f"✅ Модель сохранена: {args.output}")
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+import fcntl
+import itertools
+import os
+import threading
+
+import numpy as np
+
+# Индекс перцептивных хэшей для поиска почти одинаковых изображений
+# («хэши на расстоянии Хэмминга не больше k»).
+#
+# Поиск — multi-index hashing: 64 бита делятся на 4 части по 16 бит, и по
+# принципу Дирихле у хэша на расстоянии ≤ k хотя бы одна часть отличается не
+# больше чем на k // 4 бит. Для каждой части хранится отсортированный массив
+# ключей; все ключи в этом радиусе ищутся одним searchsorted, кандидаты
+# проверяются векторно (XOR + popcount). На миллионах записей кандидатов —
+# сотни, запрос занимает доли миллисекунды.
+#
+# На диске: snapshot.npy — сжатый снимок, delta.bin — журнал добавлений
+# (запись дописывается одним write с O_APPEND). Процессы подхватывают новые
+# записи журнала при каждом запросе, compact() переносит журнал в снимок.
+# remove() (удаление пользователя) переписывает снимок целиком — операция редкая.
+
+RECORD_DTYPE = np.dtype([('hash', '<u8'), ('owner', '<i8'), ('slot', 'u1')])
+
+SNAPSHOT_NAME = 'snapshot.npy'
+DELTA_NAME = 'delta.bin'
+LOCK_NAME = '.lock'
+
+
+CHUNKS = 4
+CHUNK_BITS = 16
+_CHUNK_MASK = np.uint64((1 << CHUNK_BITS) - 1)
+
+
+def _flip_masks(radius):
+    """Маски XOR для всех ключей части на расстоянии не больше radius."""
+    masks = [0]
+    for bits in range(1, radius + 1):
+        for positions in itertools.combinations(range(CHUNK_BITS), bits):
+            masks.append(sum(1 << p for p in positions))
+    return np.array(masks, dtype=np.uint64)
+
+
+class _Tables:
+    """Хэши снимка отдельным непрерывным массивом и отсортированные ключи их частей."""
+
+    def __init__(self, hashes):
+        self.hashes = np.ascontiguousarray(hashes)
+        self.chunks = []
+        for i in range(CHUNKS):
+            shift = np.uint64(i * CHUNK_BITS)
+            keys = ((self.hashes >> shift) & _CHUNK_MASK).astype(np.uint16)
+            order = np.argsort(keys, kind='stable')
+            self.chunks.append((shift, keys[order], order))
+        self._masks = {}
+
+    def candidates(self, value, max_distance):
+        masks = self._masks.get(max_distance)
+        if masks is None:
+            masks = self._masks[max_distance] = _flip_masks(max_distance // CHUNKS)
+
+        found = []
+        for shift, keys, order in self.chunks:
+            probes = (((value >> shift) & _CHUNK_MASK) ^ masks).astype(np.uint16)
+            lo = np.searchsorted(keys, probes, 'left')
+            hi = np.searchsorted(keys, probes, 'right')
+            for start, stop in zip(lo[hi > lo], hi[hi > lo]):
+                found.append(order[start:stop])
+        return np.concatenate(found) if found else np.empty(0, dtype=np.intp)
+
+
+class HashIndex:
+    def __init__(self, path=None, max_distance=6, compact_every=10000):
+        self.path = os.fspath(path) if path is not None else None
+        self.max_distance = max_distance
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._snapshot = np.empty(0, dtype=RECORD_DTYPE)
+        self._tables = _Tables(self._snapshot['hash'])
+        self._delta = np.empty(0, dtype=RECORD_DTYPE)
+        self._snapshot_stat = None
+        self._delta_offset = 0
+        if self.path is not None:
+            os.makedirs(self.path, exist_ok=True)
+            self._load()
+
+    def __len__(self):
+        return len(self._snapshot) + len(self._delta)
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _stat(self, name):
+        try:
+            st = os.stat(self._file(name))
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _load(self):
+        try:
+            snapshot = np.load(self._file(SNAPSHOT_NAME), allow_pickle=False)
+        except FileNotFoundError:
+            snapshot = np.empty(0, dtype=RECORD_DTYPE)
+        self._snapshot = snapshot
+        self._tables = _Tables(snapshot['hash'])
+        self._snapshot_stat = self._stat(SNAPSHOT_NAME)
+        self._delta = np.empty(0, dtype=RECORD_DTYPE)
+        self._delta_offset = 0
+        self._read_delta()
+
+    def _read_delta(self):
+        try:
+            with open(self._file(DELTA_NAME), 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if size < self._delta_offset:
+                    # Журнал перенесён в снимок другим процессом
+                    return False
+                # Только целые записи: хвост может ещё дописываться
+                usable = (size - self._delta_offset) // RECORD_DTYPE.itemsize * RECORD_DTYPE.itemsize
+                if usable:
+                    f.seek(self._delta_offset)
+                    records = np.frombuffer(f.read(usable), dtype=RECORD_DTYPE)
+                    self._delta = np.concatenate([self._delta, records])
+                    self._delta_offset += usable
+        except FileNotFoundError:
+            pass
+        return True
+
+    def refresh(self):
+        """Подхватывает записи, добавленные другими процессами."""
+        if self.path is None:
+            return
+        with self._lock:
+            if self._stat(SNAPSHOT_NAME) != self._snapshot_stat or not self._read_delta():
+                self._load()
+
+    def add(self, value, owner, slot=0):
+        record = np.array([(value, owner, slot)], dtype=RECORD_DTYPE)
+        if self.path is None:
+            with self._lock:
+                self._delta = np.concatenate([self._delta, record])
+            return
+
+        with open(self._file(LOCK_NAME), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_SH)
+            fd = os.open(self._file(DELTA_NAME), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, record.tobytes())
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+
+        # Журнал просматривается перебором — когда он разрастается, переносим в снимок
+        if self.compact_every and size // RECORD_DTYPE.itemsize >= self.compact_every:
+            self.compact()
+
+    def search(self, value, max_distance=None, exclude_owner=None):
+        """
+        Записи с хэшем на расстоянии не больше max_distance.
+        Возвращает список (owner, slot, distance), ближайшие первыми.
+        """
+        self.refresh()
+        k = self.max_distance if max_distance is None else max_distance
+        q = np.uint64(value)
+
+        with self._lock:
+            snapshot, tables, delta = self._snapshot, self._tables, self._delta
+
+        if k // CHUNKS <= 2:
+            idx = tables.candidates(q, k)
+            distances = np.bitwise_count(tables.hashes[idx] ^ q)
+        else:
+            # Радиус в части больше 2 — перебор частей дороже полного просмотра
+            distances = np.bitwise_count(tables.hashes ^ q)
+            idx = np.arange(len(distances))
+        hit = distances <= k
+        found = [(snapshot[idx[hit]], distances[hit])]
+        if len(delta):
+            distances = np.bitwise_count(delta['hash'] ^ q)
+            hit = distances <= k
+            found.append((delta[hit], distances[hit]))
+
+        matches = {}
+        for records, distances in found:
+            for record, distance in zip(records, distances):
+                owner, slot, distance = int(record['owner']), int(record['slot']), int(distance)
+                if owner == exclude_owner:
+                    continue
+                if matches.get((owner, slot), 65) > distance:
+                    matches[(owner, slot)] = distance
+
+        return sorted(((o, s, d) for (o, s), d in matches.items()), key=lambda m: m[2])
+
+    def _write_snapshot(self, records):
+        tmp = self._file(SNAPSHOT_NAME + '.tmp')
+        with open(tmp, 'wb') as f:
+            np.save(f, records, allow_pickle=False)
+        os.replace(tmp, self._file(SNAPSHOT_NAME))
+
+    def _replace(self, records, exclude_owner=None):
+        if self.path is None:
+            with self._lock:
+                if records is None:
+                    records = np.concatenate([self._snapshot, self._delta])
+                if exclude_owner is not None:
+                    records = records[records['owner'] != exclude_owner]
+                self._snapshot = np.unique(records)
+                self._tables = _Tables(self._snapshot['hash'])
+                self._delta = np.empty(0, dtype=RECORD_DTYPE)
+            return len(self._snapshot)
+
+        with open(self._file(LOCK_NAME), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if records is None:
+                self._load()
+                records = np.concatenate([self._snapshot, self._delta])
+            if exclude_owner is not None:
+                records = records[records['owner'] != exclude_owner]
+            records = np.unique(records)
+            self._write_snapshot(records)
+            with open(self._file(DELTA_NAME), 'wb'):
+                pass
+        with self._lock:
+            self._load()
+        return len(records)
+
+    def compact(self):
+        """Переносит журнал в снимок. Возвращает число записей."""
+        return self._replace(None)
+
+    def remove(self, owner):
+        """
+        Удаляет записи владельца (удалённый пользователь) с переписыванием снимка.
+        Возвращает число оставшихся записей.
+        """
+        return self._replace(None, exclude_owner=owner)
+
+    def rebuild(self, records):
+        """Заменяет содержимое индекса записями (hash, owner, slot)."""
+        return self._replace(np.array(list(records), dtype=RECORD_DTYPE))
@@ -0,0 +1,48 @@
+import numpy as np
+from PIL import Image
+
+# 64-битный перцептивный хэш (pHash): DCT уменьшенной до 32x32 копии в оттенках
+# серого, 8x8 низкочастотных коэффициентов сравниваются с медианой. Повторное
+# сжатие, масштабирование и небольшая правка яркости меняют лишь несколько бит,
+# поэтому похожесть изображений — расстояние Хэмминга между хэшами.
+
+HASH_SIZE = 8
+_SIDE = 32
+
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0] /= np.sqrt(2.0)
+    return m.astype(np.float32)
+
+
+_DCT = _dct_matrix(_SIDE)
+_WEIGHTS = (1 << np.arange(HASH_SIZE * HASH_SIZE - 1, -1, -1, dtype=np.uint64))
+
+
+def phash_image(img):
+    """pHash изображения PIL как беззнаковое 64-битное целое."""
+    gray = img.convert('L').resize((_SIDE, _SIDE), Image.Resampling.LANCZOS)
+    pixels = np.asarray(gray, dtype=np.float32)
+    dct = _DCT @ pixels @ _DCT.T
+    low = dct[:HASH_SIZE, :HASH_SIZE].ravel()
+    # Постоянная составляющая не участвует в медиане: она отражает только яркость
+    bits = low > np.median(low[1:])
+    return int(_WEIGHTS[bits].sum(dtype=np.uint64))
+
+
+def phash_file(image_file):
+    with Image.open(image_file) as img:
+        img.draft('RGB', (_SIDE * 4, _SIDE * 4))
+        return phash_image(img)
+
+
+# BigIntegerField знаковый: хэш хранится в дополнительном коде
+def to_signed(value):
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
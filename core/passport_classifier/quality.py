@@ -0,0 +1,130 @@
+import logging
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Каскад дешёвых проверок до запуска CNN. Явно негодные изображения (крошечные,
+# с неподходящими пропорциями, пустые, засвеченные, размытые, одно и то же фото
+# в разных слотах) отклоняются с кодом причины за несколько операций numpy
+# над уменьшенной копией в оттенках серого. Проверки идут от дешёвых к дорогим
+# и останавливаются на первой сработавшей.
+
+REASON_UNREADABLE = 'unreadable'
+REASON_TOO_SMALL = 'too_small'
+REASON_BAD_ASPECT = 'bad_aspect'
+REASON_TOO_DARK = 'too_dark'
+REASON_TOO_BRIGHT = 'too_bright'
+REASON_LOW_CONTRAST = 'low_contrast'
+REASON_BLURRY = 'blurry'
+REASON_DUPLICATE_SLOT = 'duplicate_slot'
+
+# Пороги яркости, контраста и резкости — в шкале 0..255 на уменьшенной копии
+DEFAULT_CONFIG = {
+    'ENABLED': True,
+    # Сторона уменьшенной копии для проверок
+    'SIDE': 256,
+    'MIN_SIDE': 200,
+    'MIN_ASPECT': 0.4,
+    'MAX_ASPECT': 2.5,
+    'MIN_BRIGHTNESS': 20,
+    'MAX_BRIGHTNESS': 240,
+    'MIN_CONTRAST': 8,
+    # Дисперсия лапласиана
+    'MIN_SHARPNESS': 15,
+    # Средняя абсолютная разница миниатюр 16x16, ниже которой фото считаются одинаковыми
+    'DUPLICATE_MAX_DIFF': 3,
+}
+
+
+def get_config(overrides=None):
+    config = dict(DEFAULT_CONFIG)
+    if overrides:
+        config.update(overrides)
+    return config
+
+
+def load_gray(image_file, side):
+    """
+    Возвращает (исходный размер, массив float32 (H, W) в оттенках серого не
+    больше side по большей стороне). JPEG декодируется через draft() в 1/8.
+    """
+    if hasattr(image_file, 'seek'):
+        image_file.seek(0)
+    with Image.open(image_file) as img:
+        size = img.size
+        img.draft('L', (side, side))
+        img = img.convert('L')
+        img.thumbnail((side, side), Image.Resampling.BILINEAR)
+        gray = np.asarray(img, dtype=np.float32)
+    if hasattr(image_file, 'seek'):
+        image_file.seek(0)
+    return size, gray
+
+
+def laplacian_variance(gray):
+    lap = (
+        gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]
+        - 4 * gray[1:-1, 1:-1]
+    )
+    return float(lap.var())
+
+
+def check_size(size, config):
+    width, height = size
+    if min(width, height) < config['MIN_SIDE']:
+        return REASON_TOO_SMALL
+    aspect = width / height
+    if not config['MIN_ASPECT'] <= aspect <= config['MAX_ASPECT']:
+        return REASON_BAD_ASPECT
+    return None
+
+
+def check_pixels(gray, config):
+    mean = float(gray.mean())
+    if mean < config['MIN_BRIGHTNESS']:
+        return REASON_TOO_DARK
+    if mean > config['MAX_BRIGHTNESS']:
+        return REASON_TOO_BRIGHT
+    if float(gray.std()) < config['MIN_CONTRAST']:
+        return REASON_LOW_CONTRAST
+    if laplacian_variance(gray) < config['MIN_SHARPNESS']:
+        return REASON_BLURRY
+    return None
+
+
+def _thumbnail(gray):
+    img = Image.fromarray(gray.astype(np.uint8)).resize((16, 16), Image.Resampling.BOX)
+    return np.asarray(img, dtype=np.float32)
+
+
+def screen_images(image_files, config=None):
+    """
+    Прогоняет изображения через каскад. Возвращает список кодов причин
+    (None — изображение прошло) в порядке image_files.
+    """
+    config = get_config(config)
+    reasons = [None] * len(image_files)
+    thumbnails = {}
+
+    for i, image_file in enumerate(image_files):
+        try:
+            size, gray = load_gray(image_file, config['SIDE'])
+        except Exception as e:
+            logger.warning("Ошибка при открытии изображения: %s", e)
+            reasons[i] = REASON_UNREADABLE
+            continue
+
+        reasons[i] = check_size(size, config) or check_pixels(gray, config)
+        if reasons[i] is None:
+            thumbnails[i] = _thumbnail(gray)
+
+    # Одно и то же фото в разных слотах (например, лицевая сторона вместо обратной)
+    passed = sorted(thumbnails)
+    for a, i in enumerate(passed):
+        for j in passed[a + 1:]:
+            if np.abs(thumbnails[i] - thumbnails[j]).mean() <= config['DUPLICATE_MAX_DIFF']:
+                reasons[i] = reasons[j] = REASON_DUPLICATE_SLOT
+
+    return reasons
@@ -0,0 +1,111 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+# Сервер инференса внутри процесса воркера (пулы threads/gevent): один поток
+# владеет моделью и собирает изображения из параллельных задач в общий батч —
+# до max_batch_size изображений или max_wait_ms ожидания, затем один forward pass.
+
+
+class InferenceQueueFull(Exception):
+    pass
+
+
+class _Request:
+    __slots__ = ('batch', 'future', 'enqueued_at')
+
+    def __init__(self, batch):
+        self.batch = batch
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class InferenceServer:
+    def __init__(self, predict, max_batch_size=32, max_wait_ms=10, max_queue=256, put_timeout=5.0):
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            'batches': 0,
+            'images': 0,
+            'max_batch_size_seen': 0,
+            'last_batch_size': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms_seen': 0.0,
+            'errors': 0,
+            'rejected': 0,
+        }
+        self._thread = threading.Thread(target=self._run, name='passport-inference', daemon=True)
+        self._thread.start()
+
+    def submit(self, batch):
+        """Ставит батч (N, H, W, 3) в очередь. Future вернёт вероятности (N, classes)."""
+        request = _Request(batch)
+        try:
+            self._queue.put(request, timeout=self.put_timeout)
+        except queue.Full:
+            with self._metrics_lock:
+                self._metrics['rejected'] += 1
+            raise InferenceQueueFull('Очередь инференса переполнена')
+        return request.future
+
+    def _collect(self):
+        requests = [self._queue.get()]
+        size = len(requests[0].batch)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            requests.append(request)
+            size += len(request.batch)
+        return requests, size
+
+    def _run(self):
+        while True:
+            requests, size = self._collect()
+            started = time.monotonic()
+
+            try:
+                # Копирование в общий массив: батчи задач лежат в их собственных буферах
+                predictions = self.predict(np.concatenate([r.batch for r in requests]))
+            except Exception as e:
+                for request in requests:
+                    request.future.set_exception(e)
+                with self._metrics_lock:
+                    self._metrics['errors'] += 1
+                continue
+
+            offset = 0
+            for request in requests:
+                n = len(request.batch)
+                request.future.set_result(predictions[offset:offset + n])
+                offset += n
+
+            wait_ms = max((started - r.enqueued_at) * 1000 for r in requests)
+            with self._metrics_lock:
+                m = self._metrics
+                m['batches'] += 1
+                m['images'] += size
+                m['last_batch_size'] = size
+                m['max_batch_size_seen'] = max(m['max_batch_size_seen'], size)
+                m['total_wait_ms'] += wait_ms
+                m['max_wait_ms_seen'] = max(m['max_wait_ms_seen'], wait_ms)
+
+    def metrics(self):
+        with self._metrics_lock:
+            m = dict(self._metrics)
+        m['queue_depth'] = self._queue.qsize()
+        m['avg_batch_size'] = m['images'] / m['batches'] if m['batches'] else 0.0
+        m['avg_wait_ms'] = m['total_wait_ms'] / m['batches'] if m['batches'] else 0.0
+        return m
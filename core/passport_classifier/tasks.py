@@ -1,19 +1,198 @@
+import logging
+import time
+
 from celery import shared_task
-from core.passport_classifier.utils import predict_passport_photo
+from celery.signals import worker_init, worker_process_init
+from celery.worker.control import inspect_command
+from django.conf import settings
+from django.db import OperationalError
+from django.utils import timezone
+from core.passport_classifier.client import ML_QUEUE, PRIORITY_RETRY, VALIDATE_PASSPORT_IMAGES_TASK
+from core.passport_classifier.phash import phash_file, to_unsigned
+from core.passport_classifier.server import InferenceQueueFull
+from core.passport_classifier.utils import (
+    get_hash_index,
+    get_inference_server,
+    model_version,
+    predict_passport_photos,
+    preload_for_fork,
+    warmup,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Модель нужна только воркерам, которые слушают очередь ml. Задачи импортируются
+# всеми воркерами (include в core/celery.py), поэтому воркер профиля default
+# не должен загружать TensorFlow в каждом дочернем процессе.
+_consumes_ml_queue = False
+# Модель загружена и прогрета в родительском процессе (preload_for_fork)
+_preloaded = False
+
+
+def consumes_ml_queue(worker):
+    return ML_QUEUE in (worker.app.amqp.queues.consume_from or {})
+
+
+# Выполняется в главном процессе воркера до запуска пула; флаг наследуют дочерние процессы
+@worker_init.connect
+def preload_passport_model(sender, **kwargs):
+    global _consumes_ml_queue, _preloaded
+    _consumes_ml_queue = consumes_ml_queue(sender)
+    if _consumes_ml_queue and getattr(settings, 'PASSPORT_MODEL_PRELOAD', True):
+        _preloaded = preload_for_fork()
+
+
+@worker_process_init.connect
+def warmup_passport_model(**kwargs):
+    if _consumes_ml_queue and not _preloaded and getattr(settings, 'PASSPORT_MODEL_WARMUP', True):
+        warmup()
+
+
+# celery -A core inspect passport_inference_stats
+@inspect_command()
+def passport_inference_stats(state):
+    server = get_inference_server()
+    return server.metrics() if server is not None else {'enabled': False}
+
+
+# acks_late + prefetch 1 у воркера ml: сообщение не теряется при падении
+# процесса и не ждёт за чужой долгой задачей в буфере prefetch
+@shared_task(
+    bind=True,
+    name=VALIDATE_PASSPORT_IMAGES_TASK,
+    acks_late=True,
+    reject_on_worker_lost=True,
+    max_retries=5,
+)
+def validate_passport_images_task(self, user_id, generation=None, token=None, submitted_at=None):
+    from apps.users.models import PassportVerification
+    from apps.users.verification import claim_generation, update_verification
+
+    if submitted_at is not None and self.request.retries == 0:
+        waited = time.time() - submitted_at
+        if waited > getattr(settings, 'PASSPORT_VERIFICATION_SLA_SECONDS', 60):
+            logger.warning("Проверка паспорта пользователя %s ждала в очереди %.1f с", user_id, waited)
+
+    # Устаревшая задача (пользователь отправил паспорт ещё раз) выходит до загрузки изображений
+    generation = claim_generation(user_id, generation, token)
+    if generation is None:
+        logger.info("Проверка паспорта пользователя %s устарела, пропускаем", user_id)
+        return
+
+    if self.request.retries == 0:
+        update_verification(user_id, generation, status=PassportVerification.STATUS_RUNNING, started_at=timezone.now())
+
+    try:
+        _validate_passport_images(user_id, generation)
+    except (InferenceQueueFull, OperationalError) as e:
+        if self.request.retries < self.max_retries:
+            # Повтор идёт с наивысшим приоритетом, раньше новых проверок
+            raise self.retry(
+                exc=e,
+                countdown=2 ** self.request.retries,
+                priority=PRIORITY_RETRY,
+                kwargs={'generation': generation, 'token': None},
+            )
+        _fail_verification(user_id, generation, e)
+        raise
+    except Exception as e:
+        _fail_verification(user_id, generation, e)
+        raise
+
+
+def _fail_verification(user_id, generation, error):
+    from apps.users.models import PassportVerification
+    from apps.users.verification import update_verification
+
+    update_verification(
+        user_id, generation,
+        status=PassportVerification.STATUS_FAILED,
+        error=repr(error)[:255],
+        finished_at=timezone.now(),
+    )
+
+
+# Порядок полей задаёт номер слота в индексе перцептивных хэшей
+PHASH_SLOTS = ('passport_front', 'passport_back', 'passport_selfie')
+
+
+def _image_phash(user, field):
+    value = getattr(user, f'{field}_phash')
+    if value is not None:
+        return to_unsigned(value)
+    # Фото загружено до появления хэшей
+    return phash_file(getattr(user, field).path)
+
+
+def _mark_reused_images(user, fields, results):
+    """
+    Ищет фото пользователя в индексе хэшей фото других аккаунтов. Совпавшие
+    результаты помечаются reason='reused_image'. Возвращает хэши по полям.
+    """
+    index = get_hash_index()
+    hashes = {}
+    for field, result in zip(fields, results):
+        hashes[field] = _image_phash(user, field)
+        matches = index.search(hashes[field], exclude_owner=user.pk)
+        if matches:
+            # Результаты видит отправитель — владельцы совпавших фото пишутся только в лог
+            logger.warning(
+                "Фото %s пользователя %s совпадает с фото других аккаунтов: %s", field, user.pk,
+                ', '.join(f"{owner}/{PHASH_SLOTS[slot]} (d={distance})" for owner, slot, distance in matches[:10]),
+            )
+            result.update(ok=False, reason='reused_image')
+    return hashes
+
+
+def _validate_passport_images(user_id, generation):
+    from apps.users.authentication import invalidate_user_claims
+    from apps.users.executor_counts import mark_verified
+    from apps.users.models import PassportVerification, User
+    from apps.users.verification import is_current_generation, update_verification
+
+    fields = ['passport_selfie', 'passport_front', 'passport_back']
+    user = User.objects.only(*fields, *(f'{field}_phash' for field in fields)).filter(id=user_id).first()
+    if user is None:
+        # Запись проверки закрыта при удалении пользователя (apps/users/signals.py)
+        logger.info("Пользователь %s удалён, проверка паспорта не выполняется", user_id)
+        return
 
-@shared_task
-def validate_passport_images_task(user_id, photo_with_face_path, front_path, back_path):
-    from apps.users.models import User
+    # Все три изображения классифицируются одним батчем
+    expected_types = ['face', 'front', 'back']
+    results = predict_passport_photos(
+        [getattr(user, field).path for field in fields],
+        expected_types=expected_types,
+        require_all=True,
+    )
 
-    user = User.objects.get(id=user_id)
+    # Пока шёл инференс, пользователь мог отправить новые фото — их проверит следующая задача
+    if not is_current_generation(user_id, generation):
+        logger.info("Результат проверки паспорта пользователя %s устарел, не сохраняем", user_id)
+        return
 
-    face_ok = predict_passport_photo(photo_with_face_path, expected_type='face')
-    front_ok = predict_passport_photo(front_path, expected_type='front')
-    back_ok = predict_passport_photo(back_path, expected_type='back')
+    hashes = {}
+    if all(result['ok'] for result in results):
+        hashes = _mark_reused_images(user, fields, results)
 
+    verified = all(result['ok'] for result in results)
+    update_verification(
+        user_id, generation,
+        status=PassportVerification.STATUS_VERIFIED if verified else PassportVerification.STATUS_REJECTED,
+        results=dict(zip(expected_types, results)),
+        model_version=model_version(),
+        finished_at=timezone.now(),
+    )
 
-    if face_ok and front_ok and back_ok: 
-        user.is_verified = True
-        user.save()
+    if verified:
+        # Одна строка без полного save(); сигналы post_save не срабатывают,
+        # счётчики исполнителей и claims обновляем сами
+        mark_verified(user_id)
+        invalidate_user_claims(user_id)
+        # В индекс попадают только фото подтверждённых пользователей: повторная
+        # отправка после отклонения не должна совпадать сама с собой
+        index = get_hash_index()
+        for field, value in hashes.items():
+            index.add(value, user_id, PHASH_SLOTS.index(field))
     else:
         user.delete()
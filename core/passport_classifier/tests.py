@@ -0,0 +1,234 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+from PIL import Image
+
+from core.passport_classifier import preprocessing, quality, utils
+from core.passport_classifier.cache import DatabasePredictionStore, MemoryPredictionStore, PredictionCache
+from core.passport_classifier.hash_index import CHUNK_BITS, CHUNKS, HashIndex, _Tables
+
+
+def image_file(pixels, format='PNG'):
+    buffer = io.BytesIO()
+    Image.fromarray(np.asarray(pixels, dtype=np.uint8)).save(buffer, format)
+    buffer.seek(0)
+    return buffer
+
+
+def noise(height=600, width=800, seed=0):
+    gray = np.random.default_rng(seed).integers(0, 256, (height, width, 1))
+    return np.repeat(gray, 3, axis=2)
+
+
+class QualityScreenTests(SimpleTestCase):
+    def screen(self, *files):
+        return quality.screen_images(list(files))
+
+    def test_sharp_image_passes(self):
+        self.assertEqual(self.screen(image_file(noise())), [None])
+
+    def test_blurry_image_is_rejected(self):
+        # Плавный градиент: контраст есть, а лапласиан почти нулевой
+        gradient = np.tile(np.linspace(0, 255, 800), (600, 1))
+        pixels = np.repeat(gradient[:, :, None], 3, axis=2)
+        self.assertEqual(self.screen(image_file(pixels)), [quality.REASON_BLURRY])
+
+    def test_exposure(self):
+        dark = np.full((600, 800, 3), 5)
+        bright = np.full((600, 800, 3), 250)
+        flat = np.full((600, 800, 3), 128)
+
+        self.assertEqual(
+            self.screen(image_file(dark), image_file(bright), image_file(flat)),
+            [quality.REASON_TOO_DARK, quality.REASON_TOO_BRIGHT, quality.REASON_LOW_CONTRAST],
+        )
+
+    def test_size_and_aspect(self):
+        small = image_file(noise(100, 150))
+        wide = image_file(noise(300, 1200))
+
+        self.assertEqual(self.screen(small, wide), [quality.REASON_TOO_SMALL, quality.REASON_BAD_ASPECT])
+
+    def test_same_photo_in_two_slots(self):
+        pixels = noise()
+        other = noise(seed=1)
+        other[:, :400] //= 3
+        self.assertEqual(
+            self.screen(image_file(pixels), image_file(pixels), image_file(other)),
+            [quality.REASON_DUPLICATE_SLOT, quality.REASON_DUPLICATE_SLOT, None],
+        )
+
+    def test_unreadable_file_is_logged(self):
+        with self.assertLogs('core.passport_classifier.quality', 'WARNING'):
+            reasons = self.screen(io.BytesIO(b'not an image'))
+
+        self.assertEqual(reasons, [quality.REASON_UNREADABLE])
+
+
+@override_settings(PASSPORT_QUALITY_CHECKS={'ENABLED': False})
+class PredictionCacheTests(TestCase):
+    def setUp(self):
+        self.data = image_file(noise(), 'JPEG').getvalue()
+        self.store = MemoryPredictionStore()
+
+    def predict(self, model_version='v1', probabilities=(0.1, 0.2, 0.7)):
+        cache = PredictionCache(self.store, model_version)
+        with mock.patch.object(utils, 'get_prediction_cache', return_value=cache), \
+                mock.patch.object(utils, 'predict_batch', return_value=np.array([probabilities])) as predict:
+            result = utils.predict_passport_photos([io.BytesIO(self.data)], ['front'])[0]
+        return result, predict
+
+    def test_miss_runs_model_and_stores_result(self):
+        result, predict = self.predict()
+
+        predict.assert_called_once()
+        self.assertEqual(predict.call_args.args[0].shape, (1, *utils.IMAGE_SIZE, 3))
+        self.assertEqual((result['label'], result['ok']), ('front', True))
+
+    def test_hit_skips_model(self):
+        first, _ = self.predict()
+        second, predict = self.predict(probabilities=(0.9, 0.05, 0.05))
+
+        predict.assert_not_called()
+        self.assertEqual(second, first)
+
+    def test_new_model_version_invalidates_entries(self):
+        self.predict('v1')
+        result, predict = self.predict('v2', probabilities=(0.9, 0.05, 0.05))
+
+        predict.assert_called_once()
+        self.assertEqual(result['label'], 'back')
+        self.assertFalse([key for key in self.store._entries if key[0] == 'v1'])
+
+    def test_database_store_invalidates_other_versions(self):
+        from apps.users.models import PassportPrediction
+
+        self.store = DatabasePredictionStore()
+        self.predict('v1')
+        _, predict = self.predict('v2')
+
+        predict.assert_called_once()
+        self.assertEqual(list(PassportPrediction.objects.values_list('model_version', flat=True)), ['v2'])
+
+
+class PreprocessingTests(SimpleTestCase):
+    def setUp(self):
+        # Крупный JPEG: draft() декодирует его с масштабом 1/8
+        y, x = np.mgrid[0:1800, 0:2400]
+        pixels = np.stack([x * 255 // 2400, y * 255 // 1800, (x + y) % 256], axis=2)
+        self.data = image_file(pixels, 'JPEG').getvalue()
+
+    def test_draft_decode_matches_full_decode(self):
+        draft = preprocessing.decode_image(io.BytesIO(self.data))
+        with Image.open(io.BytesIO(self.data)) as img:
+            full = np.asarray(img.convert('RGB').resize(preprocessing.IMAGE_SIZE), dtype=np.uint8)
+
+        self.assertEqual((draft.shape, draft.dtype), (full.shape, full.dtype))
+        self.assertEqual(draft.shape, (*preprocessing.IMAGE_SIZE[::-1], 3))
+        self.assertLess(np.abs(draft.astype(np.float32) - full).mean(), 8)
+
+    def test_batch_skips_unreadable_images(self):
+        with self.assertLogs('core.passport_classifier.preprocessing', 'WARNING'):
+            batch, valid = preprocessing.preprocess_batch(
+                [io.BytesIO(self.data), io.BytesIO(b'not an image'), io.BytesIO(self.data)], max_workers=1,
+            )
+
+        self.assertEqual(valid, [0, 2])
+        self.assertEqual((batch.shape, batch.dtype), ((2, 224, 224, 3), np.float32))
+        self.assertTrue(0 <= batch.min() and batch.max() <= 1)
+
+
+class PreloadForForkTests(SimpleTestCase):
+    @override_settings(PASSPORT_CLASSIFIER_BACKEND='tflite')
+    def test_tflite_is_loaded_and_warmed_before_fork(self):
+        backend = mock.Mock()
+        with mock.patch.object(utils, 'get_backend', return_value=backend), \
+                mock.patch.object(utils, 'model_version'), \
+                mock.patch.object(utils.gc, 'freeze') as freeze:
+            self.assertTrue(utils.preload_for_fork())
+
+        backend.predict.assert_called_once()
+        freeze.assert_called_once()
+
+    @override_settings(PASSPORT_CLASSIFIER_BACKEND='keras')
+    def test_keras_is_left_to_child_processes(self):
+        with mock.patch.object(utils, 'get_backend') as get_backend:
+            self.assertFalse(utils.preload_for_fork())
+
+        get_backend.assert_not_called()
+
+
+def flip(value, *bits):
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+
+class HashIndexTests(SimpleTestCase):
+    value = 0x0123_4567_89AB_CDEF
+
+    def setUp(self):
+        self.index = HashIndex()
+        self.index.add(self.value, owner=1, slot=0)
+        self.index.add(flip(self.value, *range(0, 64, 4)), owner=2, slot=1)
+        # Из журнала в снимок: поиск идёт по частям (multi-index)
+        self.index.compact()
+
+    def owners(self, value, **kwargs):
+        return [owner for owner, _, _ in self.index.search(value, **kwargs)]
+
+    def test_hash_is_split_into_16_bit_bands(self):
+        tables = _Tables(np.array([self.value], dtype=np.uint64))
+
+        keys = [int(keys[0]) for _, keys, _ in tables.chunks]
+        self.assertEqual(keys, [(self.value >> (i * CHUNK_BITS)) & 0xFFFF for i in range(CHUNKS)])
+
+    def test_hamming_threshold(self):
+        # Биты по разным частям и все в одной части: обе раскладки на расстоянии 6
+        spread = flip(self.value, 1, 17, 33, 49, 2, 18)
+        one_band = flip(self.value, *range(6))
+
+        self.assertEqual(self.index.search(spread), [(1, 0, 6)])
+        self.assertEqual(self.index.search(one_band), [(1, 0, 6)])
+        self.assertEqual(self.owners(flip(spread, 50)), [])
+        self.assertEqual(self.owners(flip(spread, 50), max_distance=7), [1])
+
+    def test_wide_radius_uses_full_scan(self):
+        # k // 4 > 2: кандидаты по частям не перебираются, расстояния считаются bitwise_count
+        query = flip(self.value, *range(0, 48, 4))
+
+        with mock.patch.object(_Tables, 'candidates') as candidates:
+            matches = self.index.search(query, max_distance=12)
+
+        candidates.assert_not_called()
+        self.assertEqual(matches, [(2, 1, 4), (1, 0, 12)])
+
+    def test_delta_and_exclude_owner(self):
+        self.index.add(self.value, owner=3, slot=2)
+
+        self.assertEqual(self.owners(self.value), [1, 3])
+        self.assertEqual(self.owners(self.value, exclude_owner=1), [3])
+
+    def test_remove_owner(self):
+        self.index.add(self.value, owner=3, slot=2)
+
+        self.assertEqual(self.index.remove(1), 2)
+        self.assertEqual(self.owners(self.value), [3])
+
+    def test_remove_is_persisted(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        index = HashIndex(path)
+        index.add(self.value, owner=1)
+        index.add(self.value, owner=2)
+        other = HashIndex(path)
+
+        index.remove(1)
+
+        # Другой процесс видит новый снимок, журнал очищен
+        self.assertEqual([owner for owner, _, _ in other.search(self.value)], [2])
+        self.assertEqual([owner for owner, _, _ in HashIndex(path).search(self.value)], [2])
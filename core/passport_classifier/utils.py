@@ -1,43 +1,304 @@
-from PIL import Image
+import gc
+import hashlib
+import io
+import logging
 import numpy as np
-import tensorflow as tf
+import threading
 import os
+from core.passport_classifier.cache import content_hash, create_prediction_cache
+from core.passport_classifier.hash_index import HashIndex
+from core.passport_classifier.preprocessing import IMAGE_SIZE, preprocess_batch
+from core.passport_classifier.quality import REASON_UNREADABLE, screen_images
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 model_path = os.path.join(BASE_DIR, "passport_model.keras")
+tflite_model_path = os.path.join(BASE_DIR, "passport_model.tflite")
 
-model = tf.keras.models.load_model(model_path)
+# TensorFlow и веса модели загружаются только при первом обращении,
+# чтобы веб-процессы, которые лишь ставят задачи в очередь, их не тянули.
+_backend = None
+_backend_lock = threading.Lock()
+
+_inference_server = None
+_inference_server_lock = threading.Lock()
+
+_model_version = None
+_prediction_cache = None
+_prediction_cache_ready = False
+
+_hash_index = None
+_hash_index_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
 
 class_indices = {'back': 0, 'face': 1, 'front': 2}
 class_names = {v: k for k, v in class_indices.items()}
 
-def predict_passport_photo(image_file, expected_type: str = None):
-    try:
-        img = Image.open(image_file)
-    except Exception as e:
-        print(f"❌ Ошибка при открытии изображения: {e}")
-        return False
 
-    img = img.convert('RGB')
-    img = img.resize((224, 224))
+def _backend_config():
+    from django.conf import settings
+
+    name = getattr(settings, 'PASSPORT_CLASSIFIER_BACKEND', 'tflite')
+    if name == 'tflite':
+        path = getattr(settings, 'PASSPORT_TFLITE_MODEL_PATH', tflite_model_path)
+    else:
+        path = getattr(settings, 'PASSPORT_MODEL_PATH', model_path)
+    return name, str(path)
 
-    img_array = np.array(img) / 255.0
-    if img_array.shape != (224, 224, 3):
-        print(f"❌ Неверная форма изображения: {img_array.shape}")
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                from core.passport_classifier.backends import create_backend
+
+                name, path = _backend_config()
+                logger.info("Загрузка модели (%s): %s", name, path)
+                _backend = create_backend(name, path)
+    return _backend
+
+
+def preload_for_fork():
+    """
+    Загружает и прогревает модель в родительском процессе воркера до fork, чтобы
+    дочерние процессы prefork-пула делили её страницы памяти (copy-on-write) и
+    первая задача не платила за инициализацию.
+
+    Только для бэкенда tflite (по умолчанию): TensorFlow после fork небезопасен
+    (его пулы потоков не переживают fork), поэтому keras/compiled загружаются
+    и прогреваются в каждом дочернем процессе (PASSPORT_MODEL_WARMUP).
+    """
+    name, _ = _backend_config()
+    if name != 'tflite':
+        logger.info("Бэкенд %s загружается в дочерних процессах воркера, предзагрузка до fork пропущена", name)
         return False
 
-    img_array = img_array.reshape((1, 224, 224, 3))
+    warmup()
+    model_version()
+    # Объекты, созданные до fork, исключаются из сборки мусора: иначе GC
+    # в дочерних процессах трогает их заголовки и страницы копируются
+    gc.freeze()
+    return True
+
+
+def get_inference_server():
+    """
+    Сервер микробатчинга (server.py), если включён PASSPORT_INFERENCE_SERVER['ENABLED'],
+    иначе None — тогда каждая задача вызывает модель сама.
+    """
+    global _inference_server
+    if _inference_server is None:
+        from django.conf import settings
+
+        config = getattr(settings, 'PASSPORT_INFERENCE_SERVER', None) or {}
+        if not config.get('ENABLED'):
+            return None
+
+        # Модель загружается до блокировки сервера: get_backend() берёт _backend_lock сам
+        backend = get_backend()
+        with _inference_server_lock:
+            if _inference_server is None:
+                from core.passport_classifier.server import InferenceServer
+
+                _inference_server = InferenceServer(
+                    backend.predict,
+                    max_batch_size=config.get('MAX_BATCH_SIZE', 32),
+                    max_wait_ms=config.get('MAX_WAIT_MS', 10),
+                    max_queue=config.get('MAX_QUEUE', 256),
+                )
+    return _inference_server
+
+
+def predict_batch(batch):
+    server = get_inference_server()
+    if server is None:
+        return get_backend().predict(batch)
+    return server.submit(batch).result()
+
+
+def model_version():
+    """
+    Версия модели для кэша предсказаний: settings.PASSPORT_MODEL_VERSION или
+    бэкенд + хэш файла модели. Саму модель не загружает.
+    """
+    global _model_version
+    if _model_version is None:
+        from django.conf import settings
+
+        version = getattr(settings, 'PASSPORT_MODEL_VERSION', None)
+        if not version:
+            name, path = _backend_config()
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+            version = f"{name}-{digest.hexdigest()[:16]}"
+        _model_version = version
+    return _model_version
+
+
+def get_prediction_cache():
+    global _prediction_cache, _prediction_cache_ready
+    if not _prediction_cache_ready:
+        from django.conf import settings
+
+        config = getattr(settings, 'PASSPORT_PREDICTION_CACHE', None)
+        _prediction_cache = create_prediction_cache(config, model_version()) if config else None
+        _prediction_cache_ready = True
+    return _prediction_cache
+
+
+def get_hash_index():
+    """Индекс перцептивных хэшей из settings.PASSPORT_PHASH_INDEX (загружается один раз на процесс)."""
+    global _hash_index
+    if _hash_index is None:
+        with _hash_index_lock:
+            if _hash_index is None:
+                from django.conf import settings
+
+                config = getattr(settings, 'PASSPORT_PHASH_INDEX', {})
+                _hash_index = HashIndex(
+                    config.get('PATH'),
+                    max_distance=config.get('MAX_DISTANCE', 6),
+                    compact_every=config.get('COMPACT_EVERY', 10000),
+                )
+    return _hash_index
+
 
-    prediction = model.predict(img_array)[0]
-    predicted_class = int(np.argmax(prediction))
-    predicted_label = class_names[predicted_class]
+def warmup():
+    """Загружает модель и прогоняет пустой батч, чтобы первая задача не платила за инициализацию."""
+    backend = get_backend()
+    backend.predict(np.zeros((1, *IMAGE_SIZE, 3), dtype=np.float32))
+    return backend
 
-    print(f"🔍 Prediction probabilities: {prediction}")
-    print(f"✅ Predicted class: {predicted_label}")
 
+def _read_bytes(image_file):
+    try:
+        if hasattr(image_file, 'read'):
+            if hasattr(image_file, 'seek'):
+                image_file.seek(0)
+            data = image_file.read()
+            if hasattr(image_file, 'seek'):
+                image_file.seek(0)
+            return data
+        with open(image_file, 'rb') as f:
+            return f.read()
+    except OSError as e:
+        logger.warning("Ошибка при открытии изображения: %s", e)
+        return None
+
+
+def _make_result(label, probabilities, expected_type):
     if expected_type:
         expected_class = class_indices.get(expected_type, -1)
-        print(f"🎯 Expected class: {expected_type} ({expected_class})")
-        return predicted_class == expected_class
+        ok = class_indices.get(label) == expected_class
+    else:
+        ok = True
+
+    return {'label': label, 'probabilities': probabilities, 'ok': ok, 'reason': None if ok else 'wrong_type'}
+
+
+def predict_passport_photos(image_files, expected_types=None, require_all=False):
+    """
+    Классифицирует несколько изображений за один проход модели.
+
+    Возвращает список словарей {'label', 'probabilities', 'ok', 'reason'} в
+    порядке image_files. Изображения сначала проходят каскад дешёвых проверок
+    (quality.py): отклонённые получают код причины в reason, label и
+    probabilities равны None, а ok — False. С require_all=True модель не
+    запускается вовсе, если отклонено хоть одно изображение (остальные
+    получают reason 'skipped'). Если включён кэш предсказаний, изображения,
+    уже встречавшиеся с текущей версией модели, не декодируются.
+    """
+    image_files = list(image_files)
+    if expected_types is None:
+        expected_types = [None] * len(image_files)
+    else:
+        expected_types = list(expected_types)
+        if len(expected_types) != len(image_files):
+            raise ValueError("Количество expected_types должно совпадать с количеством изображений")
+
+    from django.conf import settings
+
+    failed = {'label': None, 'probabilities': None, 'ok': False, 'reason': REASON_UNREADABLE}
+    results = [dict(failed) for _ in image_files]
+
+    quality = getattr(settings, 'PASSPORT_QUALITY_CHECKS', {})
+    rejected = [None] * len(image_files)
+    if quality.get('ENABLED', True):
+        rejected = screen_images(image_files, quality)
+        for i, reason in enumerate(rejected):
+            if reason is not None:
+                logger.info("Изображение %s отклонено до модели: %s", i, reason)
+                results[i]['reason'] = reason
+        if require_all and any(rejected):
+            for i, reason in enumerate(rejected):
+                if reason is None:
+                    results[i]['reason'] = 'skipped'
+            return results
+
+    cache = get_prediction_cache()
+
+    # (индекс, ключ кэша, источник для декодирования)
+    pending = []
+    for i, image_file in enumerate(image_files):
+        if rejected[i] is not None:
+            continue
+        if cache is None:
+            pending.append((i, None, image_file))
+            continue
+
+        data = _read_bytes(image_file)
+        if data is None:
+            continue
+
+        key = content_hash(data)
+        entry = cache.get(key)
+        if entry is not None:
+            logger.debug("Предсказание из кэша: %s", entry['label'])
+            results[i] = _make_result(entry['label'], entry['probabilities'], expected_types[i])
+            continue
+
+        # Путь передаётся как есть, чтобы preprocessing мог взять готовый артефакт
+        source = image_file if isinstance(image_file, (str, os.PathLike)) else io.BytesIO(data)
+        pending.append((i, key, source))
+
+    if not pending:
+        return results
+
+    batch, valid = preprocess_batch(
+        [source for _, _, source in pending],
+        size=IMAGE_SIZE,
+        max_workers=getattr(settings, 'PASSPORT_DECODE_THREADS', 4),
+    )
+    if not valid:
+        return results
+
+    predictions = predict_batch(batch)
+
+    for j, prediction in zip(valid, predictions):
+        i, key, _ = pending[j]
+        predicted_label = class_names[int(np.argmax(prediction))]
+        probabilities = [float(p) for p in prediction]
+
+        logger.debug("Предсказание: %s %s", predicted_label, probabilities)
+
+        if key is not None:
+            cache.set(key, predicted_label, probabilities)
+
+        results[i] = _make_result(predicted_label, probabilities, expected_types[i])
+
+    return results
+
+
+def predict_passport_photo(image_file, expected_type: str = None):
+    result = predict_passport_photos([image_file], [expected_type])[0]
+
+    if result['label'] is None:
+        return False
+
+    if expected_type:
+        return result['ok']
 
-    return predicted_label
+    return result['label']
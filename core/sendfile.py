@@ -0,0 +1,101 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date
+
+# Передача файлов без чтения байтов в Python: ответ с заголовком
+# X-Accel-Redirect (nginx) или X-Sendfile (Apache, lighttpd), файл отдаёт прокси
+# вместе с Range-запросами и медленными клиентами. Бэкенд 'django' — только для
+# разработки: файл читается воркером, Range обрабатывается здесь.
+#
+# SENDFILE_BACKEND: 'nginx' | 'xsendfile' | 'django'
+# SENDFILE_INTERNAL_URLS: {корневой каталог: internal-location nginx}
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+_CHUNK_SIZE = 64 * 1024
+
+
+def _internal_url(path):
+    for root, url in getattr(settings, 'SENDFILE_INTERNAL_URLS', {}).items():
+        root = os.path.join(os.fspath(root), '')
+        if path.startswith(root):
+            return url.rstrip('/') + '/' + quote(os.path.relpath(path, root).replace(os.sep, '/'))
+    raise ValueError(f'Нет internal-location для {path}')
+
+
+def _parse_range(header, size):
+    """(start, end) включительно, None — заголовка нет или он не разобран, False — диапазон вне файла."""
+    match = _RANGE_RE.match(header or '')
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # bytes=-N — последние N байт
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _serve_locally(request, path, stat):
+    byte_range = _parse_range(request.headers.get('Range'), stat.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+    if byte_range is None:
+        return FileResponse(open(path, 'rb'))
+
+    start, end = byte_range
+    response = StreamingHttpResponse(_read_range(path, start, end - start + 1), status=206)
+    response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    response['Content-Length'] = end - start + 1
+    return response
+
+
+def sendfile(request, path, content_type=None, encoding=None):
+    """
+    Ответ, отдающий файл path (абсолютный, внутри SENDFILE_INTERNAL_URLS).
+    content_type — тип исходного файла (для .gz/.br вариантов), encoding —
+    значение Content-Encoding для заранее сжатого варианта.
+    """
+    stat = os.stat(path)
+    if content_type is None:
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    backend = getattr(settings, 'SENDFILE_BACKEND', 'django')
+    if backend == 'nginx':
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = _internal_url(path)
+    elif backend == 'xsendfile':
+        response = HttpResponse()
+        response['X-Sendfile'] = path
+    else:
+        response = _serve_locally(request, path, stat)
+
+    # Django не должен подставлять свой тип: его берёт прокси из ответа
+    response['Content-Type'] = content_type
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
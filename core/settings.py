@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
+from kombu import Exchange, Queue
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -78,13 +82,107 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# Движок: DATABASE_ENGINE=sqlite (по умолчанию) или postgresql с параметрами из POSTGRES_*.
+# SQLite — постоянные соединения: CONN_MAX_AGE секунд на поток воркера, с проверкой
+# перед повторным использованием. PostgreSQL — встроенный пул соединений Django
+# (psycopg 3) размером DATABASE_POOL_SIZE на процесс.
+DATABASE_ENGINE = os.environ.get('DATABASE_ENGINE', 'sqlite')
+DATABASE_CONN_MAX_AGE = 600
+DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', 10))
+
+# manage.py test, pytest (pytest-django) или явно DJANGO_TESTING=1
+TESTING = (
+    os.environ.get('DJANGO_TESTING') == '1'
+    or sys.argv[1:2] == ['test']
+    or 'pytest' in sys.modules
+)
+
+
+def sqlite_database(name, replica=False, **extra):
+    options = {
+        # busy timeout, сек.: писатель ждёт блокировку, а не падает с "database is locked"
+        'timeout': 20,
+        # WAL: читатели не блокируют писателя и наоборот
+        'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+    }
+    if not replica:
+        # Блокировка на запись берётся в начале транзакции, без гонки при её повышении
+        options['transaction_mode'] = 'IMMEDIATE'
+    return {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': name,
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': options,
+        **extra,
+    }
+
+
+def postgresql_database(name, **extra):
+    # Пул несовместим с CONN_MAX_AGE: соединения возвращаются в пул после запроса
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': name,
+        'USER': os.environ.get('POSTGRES_USER', ''),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', ''),
+        'PORT': os.environ.get('POSTGRES_PORT', ''),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pool': {'min_size': 2, 'max_size': DATABASE_POOL_SIZE},
+        },
+        **extra,
+    }
+
+
+if DATABASE_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': postgresql_database(os.environ.get('POSTGRES_DB', 'jumushbar')),
+    }
+else:
+    DATABASES = {
+        'default': sqlite_database(BASE_DIR / 'db.sqlite3'),
     }
+
+# Реплика для чтения справочников и админки (core.db_router). Если не задана,
+# всё читается из default. В тестах (SQLite) реплика есть всегда и зеркалирует
+# default; тестовая БД при этом файловая, чтобы второе соединение видело
+# закоммиченные данные (проверки чтения из реплики — в TransactionTestCase).
+DATABASE_REPLICA_NAME = os.environ.get('DATABASE_REPLICA_NAME')
+if DATABASE_ENGINE == 'postgresql':
+    if DATABASE_REPLICA_NAME:
+        DATABASES['replica'] = postgresql_database(
+            DATABASE_REPLICA_NAME,
+            HOST=os.environ.get('POSTGRES_REPLICA_HOST', os.environ.get('POSTGRES_HOST', '')),
+            TEST={'MIRROR': 'default'},
+        )
+elif DATABASE_REPLICA_NAME or TESTING:
+    DATABASES['default']['TEST'] = {'NAME': BASE_DIR / 'test_db.sqlite3'}
+    DATABASES['replica'] = sqlite_database(
+        DATABASE_REPLICA_NAME or BASE_DIR / 'replica.sqlite3', replica=True, TEST={'MIRROR': 'default'},
+    )
+
+DATABASE_ROUTERS = ['core.db_router.PrimaryReplicaRouter']
+
+
+# Cache
+# Общий кэш процессов (версии справочников и т.п.) — тот же Redis, что и у Celery
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/1',
+    },
+    # Запасной кэш процесса, если Redis недоступен (троттлинг)
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
 }
 
+# Справочники: max-age для клиентов и размер кэша отрендеренных ответов в процессе
+REFERENCE_CACHE_MAX_AGE = 60
+REFERENCE_CACHE_MAX_ENTRIES = 512
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -120,12 +218,64 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
+# OpenAPI-схема, сгенерированная при деплое (manage.py export_openapi_schema).
+# Генерация на лету — только как запасной вариант при отладке.
+OPENAPI_SCHEMA_DIR = BASE_DIR / 'openapi'
+OPENAPI_SCHEMA_LIVE = DEBUG
+OPENAPI_SCHEMA_MAX_AGE = 300
+
+SWAGGER_SETTINGS = {
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
+}
+REDOC_SETTINGS = {
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
+}
+
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'static'
 
+# collectstatic с хэшами в именах и заранее сжатыми .gz/.br (core/storage.py).
+# При DEBUG манифест не нужен, поэтому по умолчанию включается только в продакшене.
+STATIC_MANIFEST = os.environ.get('STATIC_MANIFEST', '0' if DEBUG else '1') == '1'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': (
+            'core.storage.CompressedManifestStaticFilesStorage' if STATIC_MANIFEST
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
+STATIC_MAX_AGE = 3600
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR/ 'media'
 
+# Передача файлов прокси (core/sendfile.py): 'nginx' (X-Accel-Redirect),
+# 'xsendfile' (Apache/lighttpd) или 'django' (файл читает воркер — только для разработки).
+# Для nginx каждому каталогу нужен internal-location, например:
+#   location /_internal/static/ { internal; alias /app/static/; gzip_static on; gzip_vary on; brotli_static on; }
+#   location /_internal/media/  { internal; alias /app/media/; }
+SENDFILE_BACKEND = os.environ.get('SENDFILE_BACKEND', 'django' if DEBUG else 'nginx')
+SENDFILE_INTERNAL_URLS = {
+    STATIC_ROOT: '/_internal/static/',
+    MEDIA_ROOT: '/_internal/media/',
+}
+
+# Загрузки больше этого размера пишутся во временный файл, а не держатся в памяти
+FILE_UPLOAD_MAX_MEMORY_SIZE = 512 * 1024
+
+# Фото паспорта: лимиты до декодирования и параметры канонической версии
+PASSPORT_UPLOAD_MAX_BYTES = 20 * 1024 * 1024
+PASSPORT_UPLOAD_MAX_PIXELS = 50_000_000
+PASSPORT_IMAGE_MAX_SIDE = 1600
+PASSPORT_IMAGE_QUALITY = 85
+
+# Загрузка фото частями: временные файлы (вне MEDIA_ROOT), рекомендуемый и максимальный размер части
+PASSPORT_CHUNKED_UPLOAD_DIR = BASE_DIR / 'uploads_tmp'
+PASSPORT_UPLOAD_CHUNK_SIZE = 512 * 1024
+PASSPORT_UPLOAD_MAX_CHUNK_SIZE = 2 * 1024 * 1024
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -135,10 +285,23 @@ AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # Token bucket для входа, регистрации и подтверждения email (apps.users.throttling)
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': '30/min',
+        'login_email': '5/min',
+        'register_ip': '10/hour',
+        'verify_email_ip': '30/min',
+        'verify_email_email': '5/min',
+        'verification_status_ip': '60/min',
+    },
+    # Число прокси перед приложением (nginx — 1): IP клиента берётся из последнего
+    # адреса X-Forwarded-For, который дописал прокси, а не из подставленного клиентом.
+    # Без прокси — 0, тогда используется REMOTE_ADDR
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 1)),
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
         'rest_framework.parsers.FormParser',
@@ -149,6 +312,10 @@ REST_FRAMEWORK = {
 # jwt
 from datetime import timedelta
 
+# Сколько claims access-токена принимаются без чтения пользователя из БД
+# (apps/users/authentication.py); после этого — до обновления токена через /auth/token/refresh/
+AUTH_CLAIMS_MAX_AGE = timedelta(minutes=15)
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=3),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=120),
@@ -166,6 +333,7 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
 
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    'TOKEN_REFRESH_SERIALIZER': 'apps.users.serializers.CustomTokenRefreshSerializer',
     'TOKEN_TYPE_CLAIM': 'token_type',
 
     'JTI_CLAIM': 'jti',
@@ -223,8 +391,110 @@ EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = 'nurlanuuulubeksultan@gmail.com'
 EMAIL_HOST_PASSWORD = 'ncwbgzftrqhzufnx'
+# Сколько секунд воркер держит простаивающее SMTP-соединение открытым
+EMAIL_CONNECTION_IDLE_TIMEOUT = 60
 
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
-CELERY_TASK_SERIALIZER = 'json'
\ No newline at end of file
+CELERY_TASK_SERIALIZER = 'json'
+
+# Очереди: ml — проверка паспортов (секунды на задачу), default и mail — лёгкие задачи.
+# Каждую очередь обслуживает свой воркер со своими concurrency и prefetch,
+# запуск: python -m core.workers <профиль> (см. CELERY_WORKER_PROFILES).
+# Очереди объявлены явно, поэтому воркер без -Q (celery -A core worker, локальная
+# разработка) слушает все три и письма не остаются без потребителя.
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_QUEUES = [Queue(name, Exchange(name), routing_key=name) for name in ('default', 'mail', 'ml')]
+CELERY_TASK_ROUTES = {
+    'core.passport_classifier.tasks.validate_passport_images_task': {'queue': 'ml'},
+    'apps.users.tasks.send_verification_email_task': {'queue': 'mail'},
+}
+# Приоритеты внутри очереди (Redis): 0 — наивысший. Повторы проверок
+# идут раньше новых, чтобы давно ждущие пользователи не уходили в конец очереди.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'queue_order_strategy': 'priority',
+    'priority_steps': list(range(10)),
+    'sep': ':',
+}
+CELERY_TASK_DEFAULT_PRIORITY = 5
+
+CELERY_WORKER_PROFILES = {
+    'ml': {
+        'queues': ['ml'],
+        'concurrency': 2,
+        # Не забирать из очереди больше, чем обрабатывается; подтверждение после выполнения
+        'prefetch_multiplier': 1,
+        'pool': 'prefork',
+    },
+    'default': {
+        'queues': ['default', 'mail'],
+        'concurrency': 8,
+        'prefetch_multiplier': 4,
+        'pool': 'prefork',
+    },
+}
+
+# Ожидаемое время от отправки до начала проверки паспорта; превышения пишутся в лог
+PASSPORT_VERIFICATION_SLA_SECONDS = 60
+# Сколько держится отметка о задаче проверки в очереди (повторные отправки её не дублируют)
+PASSPORT_VERIFICATION_PENDING_TIMEOUT = 600
+# Сколько помнится поколение, взятое задачей (повторная доставка после падения воркера);
+# больше visibility timeout Redis-брокера (1 час по умолчанию)
+PASSPORT_VERIFICATION_CLAIM_TIMEOUT = 7200
+# Статус проверки отвечает сразу; пока проверка не завершена, ответ содержит
+# Retry-After — через сколько секунд спросить снова
+PASSPORT_VERIFICATION_RETRY_AFTER = 3
+
+# Классификатор паспортов
+# Бэкенд инференса: 'tflite' (квантованная модель из export_passport_model.py,
+# по умолчанию — загружается до fork и делится между процессами воркера),
+# 'keras' (полная модель) или 'compiled' (tf.function с фиксированной сигнатурой).
+# keras/compiled загружаются в каждом дочернем процессе отдельно
+PASSPORT_CLASSIFIER_BACKEND = 'tflite'
+PASSPORT_MODEL_PATH = BASE_DIR / 'core' / 'passport_classifier' / 'passport_model.keras'
+PASSPORT_TFLITE_MODEL_PATH = BASE_DIR / 'core' / 'passport_classifier' / 'passport_model.tflite'
+
+# Версия модели для кэша предсказаний; по умолчанию — хэш файла модели
+PASSPORT_MODEL_VERSION = None
+
+# Кэш предсказаний по содержимому изображения: BACKEND — 'memory', 'file' или 'db'
+# (LOCATION нужен только для 'file'). None отключает кэш.
+PASSPORT_PREDICTION_CACHE = {
+    'BACKEND': 'db',
+    'MAX_ENTRIES': 100000,
+}
+
+# Число потоков для параллельного декодирования изображений одной проверки
+PASSPORT_DECODE_THREADS = 4
+
+# Каскад дешёвых проверок до модели (core/passport_classifier/quality.py):
+# ключи переопределяют quality.DEFAULT_CONFIG
+PASSPORT_QUALITY_CHECKS = {
+    'ENABLED': True,
+}
+
+# Индекс перцептивных хэшей фото подтверждённых пользователей: поиск фото,
+# повторно использованных в других аккаунтах (core/passport_classifier/hash_index.py).
+# MAX_DISTANCE — порог расстояния Хэмминга из 64 бит.
+PASSPORT_PHASH_INDEX = {
+    'PATH': BASE_DIR / 'passport_phash_index',
+    'MAX_DISTANCE': 6,
+    'COMPACT_EVERY': 10000,
+}
+
+# Микробатчинг инференса между параллельными задачами одного воркера.
+# Имеет смысл с пулом threads/gevent: celery -A core worker -P threads -c 16
+PASSPORT_INFERENCE_SERVER = {
+    'ENABLED': False,
+    'MAX_BATCH_SIZE': 32,
+    'MAX_WAIT_MS': 10,
+    'MAX_QUEUE': 256,
+}
+
+# Прогрев модели классификатора паспортов при старте процесса воркера (только воркеры очереди ml)
+PASSPORT_MODEL_WARMUP = True
+
+# Загрузка и прогрев модели в родительском процессе prefork-пула, чтобы дочерние
+# процессы делили её память (только для бэкенда tflite). Проверка: manage.py passport_worker_memory
+PASSPORT_MODEL_PRELOAD = True
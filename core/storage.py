@@ -0,0 +1,53 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# collectstatic: имена с хэшем содержимого (staticfiles.json) и рядом с каждым
+# сжимаемым файлом — заранее сжатые варианты .gz и .br (если установлен brotli).
+# Прокси или core.views.static_file_view отдают их без сжатия на лету.
+
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.html', '.xml',
+    '.ico', '.ttf', '.otf', '.eot', '.md',
+}
+MIN_COMPRESS_SIZE = 512
+
+
+def _compressed_variants(data):
+    yield '.gz', gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+
+        names = set(self.hashed_files) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+
+        for suffix, compressed in _compressed_variants(data):
+            # Выигрыш меньше 5% не стоит отдельного файла
+            if len(compressed) < len(data) * 0.95:
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
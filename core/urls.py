@@ -1,33 +1,23 @@
 from django.contrib import admin
 from django.urls import path, include
-from django.conf.urls.static import static
 from django.conf import settings
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Jumush.kg",
-        default_version='v1',
-        description="Jumush.kg description",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="nurlanuuulubeksultan@gmail.com"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from core.openapi import schema_file_view, schema_view
+from core.views import media_file_view, static_file_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("api/v1/users/", include("apps.users.urls")),
 
-    # Swagger и Redoc
-    path('swagger<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
+    # Swagger и Redoc: схема заранее сгенерирована (core/openapi.py),
+    # UI загружает её по SPEC_URL из SWAGGER_SETTINGS / REDOC_SETTINGS
+    path('swagger<format>/', schema_file_view, name='schema-json'),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 ]
 
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
+# Файлы отдаёт прокси по X-Accel-Redirect / X-Sendfile (core/sendfile.py)
+urlpatterns += [
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", media_file_view, name='media'),
+    path(f"{settings.STATIC_URL.strip('/')}/<path:path>", static_file_view, name='static'),
+]
@@ -0,0 +1,79 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import Http404
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_safe
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import AllowAny
+
+from apps.users.authentication import ClaimsJWTAuthentication
+from apps.users.permissions import can_view_media
+from core.sendfile import sendfile
+
+# Раздача статики и медиа без передачи байтов через воркер (см. core/sendfile.py).
+#
+# Статика собирается collectstatic в core.storage.CompressedManifestStaticFilesStorage:
+# файлы с хэшем в имени кэшируются навсегда, рядом лежат .br/.gz. Для nginx
+# ответ ссылается на исходный файл, а сжатый вариант выбирает сам nginx
+# (gzip_static/brotli_static в internal-location): Content-Encoding из ответа
+# бэкенда после X-Accel-Redirect не сохраняется. Для остальных бэкендов вариант
+# выбирается здесь по Accept-Encoding.
+#
+# Медиа: фото паспорта отдаются только после проверки прав (apps.users.permissions).
+
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _resolve(root, path):
+    try:
+        full_path = safe_join(os.fspath(root), path)
+    except Exception:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    return full_path
+
+
+@require_safe
+def static_file_view(request, path):
+    full_path = _resolve(settings.STATIC_ROOT, path)
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    source, encoding = full_path, None
+    if getattr(settings, 'SENDFILE_BACKEND', 'django') != 'nginx':
+        accepted = request.headers.get('Accept-Encoding', '')
+        for name, suffix in PRECOMPRESSED:
+            if name in accepted and os.path.isfile(full_path + suffix):
+                source, encoding = full_path + suffix, name
+                break
+
+    response = sendfile(request, source, content_type=content_type, encoding=encoding)
+    if HASHED_NAME_RE.search(path):
+        response['Cache-Control'] = IMMUTABLE_CACHE
+    else:
+        response['Cache-Control'] = f"public, max-age={getattr(settings, 'STATIC_MAX_AGE', 3600)}"
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+@api_view(['GET', 'HEAD'])
+@authentication_classes([ClaimsJWTAuthentication, SessionAuthentication])
+@permission_classes([AllowAny])
+def media_file_view(request, path):
+    full_path = _resolve(settings.MEDIA_ROOT, path)
+    name = os.path.relpath(full_path, os.fspath(settings.MEDIA_ROOT)).replace(os.sep, '/')
+    if not can_view_media(request.user, name):
+        # Существование чужого файла не раскрывается
+        raise Http404
+
+    response = sendfile(request._request, full_path)
+    response['Cache-Control'] = 'private, no-cache' if name.startswith('passport/') else 'public, max-age=86400'
+    return response
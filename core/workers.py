@@ -0,0 +1,38 @@
+"""
+Запуск Celery-воркера для профиля очередей из settings.CELERY_WORKER_PROFILES.
+
+    python -m core.workers ml
+    python -m core.workers default --loglevel=info
+"""
+import os
+import sys
+
+
+def build_argv(profile, extra_args=()):
+    return [
+        'worker',
+        f"--queues={','.join(profile['queues'])}",
+        f"--concurrency={profile['concurrency']}",
+        f"--prefetch-multiplier={profile['prefetch_multiplier']}",
+        f"--pool={profile.get('pool', 'prefork')}",
+        *extra_args,
+    ]
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+    from django.conf import settings
+    from core.celery import app
+
+    profiles = settings.CELERY_WORKER_PROFILES
+    if not argv or argv[0] not in profiles:
+        sys.exit(f"Укажите профиль: {', '.join(profiles)}")
+
+    name, extra_args = argv[0], argv[1:]
+    app.worker_main(build_argv(profiles[name], extra_args) + [f'--hostname={name}@%h'])
+
+
+if __name__ == '__main__':
+    main()